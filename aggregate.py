@@ -0,0 +1,77 @@
+from collections import Counter
+
+
+class MatchAggregate:
+    """Running totals over a stream of matches.
+
+    Filled once per match while the matches stream out of stream_matches,
+    then read by the search summary, the report header and JobStats, so none
+    of them has to walk the results again. Channels are listed in the
+    configured order when one is given, otherwise in order of arrival.
+    """
+
+    def __init__(self, channels=None):
+        self.job_count = 0
+        self.with_contact = 0
+        self.keyword_counts = Counter()
+        self._channels = dict.fromkeys(channels or [], 0)
+
+    @classmethod
+    def of(cls, messages, channels=None):
+        aggregate = cls(channels)
+        for msg in messages:
+            aggregate.add(msg)
+        return aggregate
+
+    @classmethod
+    def of_channel_counts(cls, channel_counts):
+        """Totals of a slice of a report, where only the jobs per channel are known"""
+        aggregate = cls(channel_counts)
+        aggregate._channels.update(channel_counts)
+        aggregate.job_count = sum(channel_counts.values())
+        return aggregate
+
+    def add(self, job):
+        self.job_count += 1
+        self.with_contact += bool(job.get('has_contact'))
+        self.keyword_counts.update(job.get('matched_keywords', ()))
+        self._channels[job['channel']] = self._channels.get(job['channel'], 0) + 1
+
+    def merge(self, other):
+        """Add another aggregate's totals to this one"""
+        self.job_count += other.job_count
+        self.with_contact += other.with_contact
+        self.keyword_counts.update(other.keyword_counts)
+        for channel, count in other.channel_counts.items():
+            self._channels[channel] = self._channels.get(channel, 0) + count
+        return self
+
+    @property
+    def channel_counts(self):
+        return {channel: count for channel, count in self._channels.items() if count}
+
+    @property
+    def contact_share(self):
+        return self.with_contact / self.job_count if self.job_count else 0.0
+
+
+def test_aggregate():
+    jobs = [
+        {"channel": "@b", "matched_keywords": ["Python"], "has_contact": True},
+        {"channel": "@a", "matched_keywords": ["Python", "Go"], "has_contact": False},
+        {"channel": "@b", "matched_keywords": ["Go"], "has_contact": True},
+    ]
+    aggregate = MatchAggregate.of(jobs, ["@a", "@b", "@c"])
+    assert aggregate.job_count == 3 and aggregate.with_contact == 2
+    assert aggregate.channel_counts == {"@a": 1, "@b": 2} and list(aggregate.channel_counts) == ["@a", "@b"]
+    assert aggregate.keyword_counts == {"Python": 2, "Go": 2}
+    assert list(MatchAggregate.of(jobs).channel_counts) == ["@b", "@a"]
+
+    merged = MatchAggregate().merge(MatchAggregate.of(jobs[:1])).merge(MatchAggregate.of(jobs[1:]))
+    assert (merged.job_count, merged.with_contact, merged.channel_counts, merged.keyword_counts) == \
+        (3, 2, {"@b": 2, "@a": 1}, aggregate.keyword_counts)
+    print("✅ Match totals are counted in one pass")
+
+
+if __name__ == "__main__":
+    test_aggregate()
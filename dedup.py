@@ -0,0 +1,171 @@
+import hashlib
+import json
+import os
+import random
+import re
+from collections import OrderedDict
+from typing import Dict, List
+
+WORD_PATTERN = re.compile(r'\w+')
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+MERSENNE_PRIME = (1 << 61) - 1
+
+# Fixed seed so signatures stay comparable with the saved index
+_rng = random.Random(8)
+PERMUTATIONS = [(_rng.randrange(1, MERSENNE_PRIME), _rng.randrange(MERSENNE_PRIME)) for _ in range(NUM_PERM)]
+
+
+def shingles(text: str, size=2):
+    """Word n-grams of the lowercased post"""
+    words = WORD_PATTERN.findall(text.lower())
+    if len(words) <= size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def minhash(text: str) -> tuple:
+    """MinHash signature; the share of equal slots estimates Jaccard similarity"""
+    hashes = [int.from_bytes(hashlib.blake2b(s.encode(), digest_size=8).digest(), "big")
+              for s in shingles(text)]
+    if not hashes:
+        return (0,) * NUM_PERM
+    return tuple(min((a * h + b) % MERSENNE_PRIME for h in hashes) for a, b in PERMUTATIONS)
+
+
+def similarity(first, second) -> float:
+    return sum(x == y for x, y in zip(first, second)) / NUM_PERM
+
+
+class DuplicateDetector:
+    """Streaming near-duplicate detector with a bounded LSH index.
+
+    MinHash signatures are split into 16 bands of 4 rows and only posts that
+    share a band bucket are compared, so a lookup costs about the same no
+    matter how many posts are indexed. The oldest entries are evicted past
+    max_entries, and the index is saved to index_file when one is given so
+    reposts are recognised on later runs too.
+    """
+
+    def __init__(self, index_file=None, max_entries=5000, threshold=0.6):
+        self.index_file = index_file
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.buckets: Dict[tuple, set] = {}
+        self.load_index()
+
+    @staticmethod
+    def _bands(signature):
+        return [(band, signature[band * ROWS:(band + 1) * ROWS]) for band in range(BANDS)]
+
+    def load_index(self):
+        if self.index_file and os.path.exists(self.index_file):
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                for key, signature, url in json.load(f)["entries"]:
+                    self.add(key, tuple(signature), url)
+
+    def save_index(self):
+        if not self.index_file:
+            return
+        tmp_file = f"{self.index_file}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump({"entries": [[key, list(sig), url] for key, (sig, url) in self.entries.items()]}, f)
+        os.replace(tmp_file, self.index_file)
+
+    def find(self, signature):
+        """Key of an indexed post at least `threshold` similar, or None"""
+        checked = set()
+        for band in self._bands(signature):
+            for key in self.buckets.get(band, ()):
+                if key in checked:
+                    continue
+                checked.add(key)
+                if similarity(self.entries[key][0], signature) >= self.threshold:
+                    return key
+        return None
+
+    def add(self, key, signature, url):
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            return
+        self.entries[key] = (signature, url)
+        for band in self._bands(signature):
+            self.buckets.setdefault(band, set()).add(key)
+
+        while len(self.entries) > self.max_entries:
+            old_key, (old_signature, _) = self.entries.popitem(last=False)
+            for band in self._bands(old_signature):
+                bucket = self.buckets[band]
+                bucket.discard(old_key)
+                if not bucket:
+                    del self.buckets[band]
+
+    def check(self, result: Dict, kept: Dict[str, Dict]) -> bool:
+        """Return True if the match is new and should be kept.
+
+        `kept` holds the matches kept so far in this run. A copy of one of
+        them is added to its "duplicates" links; a repost of a job from an
+        earlier run is dropped. A JobMatch from the matching pool brings its
+        signature along, so only the band lookup runs here.
+        """
+        key = f"{result['channel']}/{result['id']}"
+        signature = getattr(result, "signature", None)
+        if signature is None:
+            signature = minhash(result['text'])
+        else:
+            result.signature = None  # Kept in the index from here on
+        original = self.find(signature)
+
+        if original is None or original == key:
+            result.setdefault("duplicates", [])
+            kept[key] = result
+            self.add(key, signature, result['url'])
+            return True
+
+        if original in kept:
+            kept[original]["duplicates"].append(result['url'])
+        return False
+
+    def collapse(self, results: List[Dict]) -> List[Dict]:
+        """Merge near-duplicate matches into the first copy and drop reposts of earlier runs.
+
+        The kept entry lists the links of its copies under "duplicates".
+        """
+        kept: Dict[str, Dict] = {}
+        unique = [result for result in results if self.check(result, kept)]
+
+        merged = sum(len(result["duplicates"]) for result in unique)
+        reposts = len(results) - len(unique) - merged
+        if merged or reposts:
+            print(f"🔁 Collapsed {merged} duplicates and skipped {reposts} reposts")
+        return unique
+
+
+def test_near_duplicates():
+    post = ("We are hiring a Senior Python developer to join our remote team. Experience with Django, "
+            "PostgreSQL and Docker is required. Competitive salary and flexible hours. Apply via @hr_team")
+    edited = post.replace("flexible hours", "flexible working hours") + " 🔥"
+    other = ("Looking for a React frontend engineer for an office role in Berlin. TypeScript and testing "
+             "experience needed. Send your CV to jobs@example.com")
+
+    def result(channel, msg_id, text):
+        return {"channel": channel, "id": msg_id, "text": text, "url": f"https://t.me/{channel[1:]}/{msg_id}"}
+
+    detector = DuplicateDetector(max_entries=100)
+    unique = detector.collapse([
+        result("@a", 1, post), result("@b", 7, edited), result("@a", 2, other), result("@c", 3, post)
+    ])
+    assert [r["id"] for r in unique] == [1, 2], unique
+    assert unique[0]["duplicates"] == ["https://t.me/b/7", "https://t.me/c/3"]
+
+    # Next run: a repost is skipped, the same post fetched again is kept
+    assert detector.collapse([result("@d", 9, edited)]) == []
+    assert len(detector.collapse([result("@a", 1, post)])) == 1
+    print(f"✅ Near duplicates collapsed (similarity {similarity(minhash(post), minhash(edited)):.2f}, "
+          f"unrelated {similarity(minhash(post), minhash(other)):.2f})")
+
+
+if __name__ == "__main__":
+    test_near_duplicates()
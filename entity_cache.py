@@ -0,0 +1,182 @@
+import asyncio
+import sqlite3
+import time
+
+from telethon.errors import ChannelInvalidError, ChannelPrivateError, PeerIdInvalidError
+from telethon.tl.types import InputPeerChannel, InputPeerChat, InputPeerUser
+from telethon.utils import parse_username
+
+# Usernames can be dropped and taken by someone else, so even good entries are re-resolved now and then
+DEFAULT_TTL = 7 * 24 * 3600
+# A cached peer that fails with one of these is resolved again
+STALE_PEER_ERRORS = (ChannelInvalidError, ChannelPrivateError, PeerIdInvalidError)
+
+
+class EntityCache:
+    """SQLite cache of channel usernames resolved to input peers.
+
+    Telegram rate limits ResolveUsername tightly, so each username is looked
+    up once with client.get_input_entity and its id and access hash are
+    reused by every later search until `ttl` runs out or a request with the
+    cached peer fails. Access hashes belong to the account that resolved
+    them, so a cache must only be used with one account.
+    """
+
+    def __init__(self, db_path="channel_entities.db", ttl=DEFAULT_TTL):
+        self.db_path = db_path
+        self.ttl = ttl
+        self._locks = {}
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.invalidated = 0
+
+        self.db = sqlite3.connect(db_path)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS entities (
+                username TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                id INTEGER NOT NULL,
+                access_hash INTEGER,
+                resolved_at REAL NOT NULL
+            )
+        """)
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+    @staticmethod
+    def _key(channel):
+        """Lowercase username for @name or t.me links, None for anything else (ids, invites, peers)"""
+        if not isinstance(channel, str):
+            return None
+        username, is_invite = parse_username(channel)
+        return None if is_invite or not username else username.lower()
+
+    def _get(self, key):
+        row = self.db.execute(
+            "SELECT kind, id, access_hash, resolved_at FROM entities WHERE username = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        kind, peer_id, access_hash, resolved_at = row
+        if time.time() - resolved_at >= self.ttl:
+            self.expired += 1
+            return None
+        if kind == "channel":
+            return InputPeerChannel(peer_id, access_hash)
+        if kind == "user":
+            return InputPeerUser(peer_id, access_hash)
+        return InputPeerChat(peer_id)
+
+    def _put(self, key, peer):
+        if isinstance(peer, InputPeerChannel):
+            row = ("channel", peer.channel_id, peer.access_hash)
+        elif isinstance(peer, InputPeerUser):
+            row = ("user", peer.user_id, peer.access_hash)
+        elif isinstance(peer, InputPeerChat):
+            row = ("chat", peer.chat_id, None)
+        else:
+            return
+        with self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO entities (username, kind, id, access_hash, resolved_at) VALUES (?, ?, ?, ?, ?)",
+                (key, *row, time.time())
+            )
+
+    async def resolve(self, client, channel, limiter=None):
+        """The input peer for channel, asking Telegram only when it is not cached"""
+        key = self._key(channel)
+        if key is None:
+            return channel
+
+        # Concurrent searches of one channel wait for a single lookup
+        async with self._locks.setdefault(key, asyncio.Lock()):
+            peer = self._get(key)
+            if peer is not None:
+                self.hits += 1
+                return peer
+
+            self.misses += 1
+            if limiter is not None:
+                await limiter.acquire()
+            peer = await client.get_input_entity(channel)
+            self._put(key, peer)
+            return peer
+
+    def invalidate(self, channel):
+        key = self._key(channel)
+        if key is None:
+            return
+        with self.db:
+            if self.db.execute("DELETE FROM entities WHERE username = ?", (key,)).rowcount:
+                self.invalidated += 1
+
+    async def warm(self, client, channels, limiter=None):
+        """Resolve every channel not cached yet, e.g. right after a config is saved.
+
+        Returns how many could not be resolved; errors are only logged.
+        """
+        failed = 0
+        for channel in dict.fromkeys(channels):
+            try:
+                await self.resolve(client, channel, limiter)
+            except Exception as e:
+                failed += 1
+                print(f"⚠️ Could not resolve {channel}: {e}")
+        return failed
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "invalidated": self.invalidated,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "cached_entities": self.db.execute("SELECT COUNT(*) FROM entities").fetchone()[0],
+        }
+
+    def format_stats(self):
+        stats = self.stats()
+        return (f"🔗 Entity cache: {stats['hits']} username lookups avoided, {stats['misses']} resolved "
+                f"({stats['hit_rate']:.0%} hit rate, {stats['expired']} expired, "
+                f"{stats['invalidated']} invalidated), {stats['cached_entities']} cached")
+
+
+async def test_entity_cache():
+    import os
+    import tempfile
+
+    from fake_client import FakeTelegramClient
+    from job_filter import fetch_and_filter_messages
+
+    channels = {"@remote_work": [f"Remote Python job {i}" for i in range(10)], "@go_jobs": ["Go job"] * 5}
+    config = {"channels": list(channels), "keywords": ["Python", "Go"], "message_limit": 20, "deduplicate": False}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        client = FakeTelegramClient(channels)
+        cache = EntityCache(os.path.join(tmp, "channel_entities.db"))
+        assert await cache.warm(client, config["channels"] + ["@REMOTE_work", "@missing"]) == 1
+        for _ in range(5):
+            results = await fetch_and_filter_messages(client, config, entities=cache)
+            assert len(results) == 15
+        assert client.resolutions == 3 and cache.hits == 11, (client.resolutions, cache.stats())
+        cache.close()
+
+        # Entries survive a restart; a peer Telegram rejects is resolved again
+        cache = EntityCache(os.path.join(tmp, "channel_entities.db"))
+        client.stale_peers.add("@go_jobs")
+        results = await fetch_and_filter_messages(client, config, entities=cache)
+        assert len(results) == 15 and client.resolutions == 4 and cache.invalidated == 1, cache.stats()
+
+        cache.ttl = 0
+        await cache.resolve(client, "https://t.me/remote_work")
+        assert client.resolutions == 5 and cache.expired == 1
+        print(f"✅ {cache.format_stats()}")
+        cache.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(test_entity_cache())
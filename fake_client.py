@@ -0,0 +1,91 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from telethon.errors import ChannelInvalidError, FloodWaitError, UsernameNotOccupiedError
+from telethon.tl.types import InputPeerChannel
+
+
+class FakeMessage:
+    def __init__(self, id, message, date):
+        self.id = id
+        self.message = message
+        self.date = date
+
+
+class FakeTelegramClient:
+    """Local stand-in for TelegramClient used by the test helpers.
+
+    channels maps a channel name to its posts (oldest first). latency is
+    slept before every request and flood_errors maps a channel to how many
+    FloodWait errors it raises before answering. Channels resolve to
+    InputPeerChannel peers; a channel in stale_peers rejects the peer it was
+    last resolved to once.
+    """
+
+    def __init__(self, channels, latency=0.0, flood_errors=None, flood_seconds=1):
+        self.latency = latency
+        self.flood_errors = dict(flood_errors or {})
+        self.flood_seconds = flood_seconds
+        self.requests = 0
+        self.resolutions = 0
+        self.stale_peers = set()
+        self.active = 0
+        self.max_active = 0
+
+        start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        self.channels = {
+            channel: [FakeMessage(i + 1, text, start + timedelta(minutes=i)) for i, text in enumerate(texts)]
+            for channel, texts in channels.items()
+        }
+
+    def post(self, channel, text):
+        """Append a new post to a channel and return it"""
+        messages = self.channels.setdefault(channel, [])
+        last = messages[-1] if messages else None
+        msg = FakeMessage(
+            last.id + 1 if last else 1,
+            text,
+            last.date + timedelta(minutes=1) if last else datetime.now(timezone.utc)
+        )
+        messages.append(msg)
+        return msg
+
+    async def get_input_entity(self, channel):
+        self.resolutions += 1
+        await asyncio.sleep(self.latency)
+        if channel.startswith("https://t.me/"):
+            channel = "@" + channel[len("https://t.me/"):]
+        names = {name.lower(): name for name in self.channels}
+        if channel.lower() not in names:
+            raise UsernameNotOccupiedError(request=None)
+        return InputPeerChannel(list(self.channels).index(names[channel.lower()]) + 1, self.resolutions)
+
+    async def iter_messages(self, channel, limit=None, offset_id=0, min_id=0):
+        if isinstance(channel, InputPeerChannel):
+            channel = list(self.channels)[channel.channel_id - 1]
+            if channel in self.stale_peers:
+                self.stale_peers.discard(channel)
+                raise ChannelInvalidError(request=None)
+        self.requests += 1
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.latency)
+            if self.flood_errors.get(channel):
+                self.flood_errors[channel] -= 1
+                raise FloodWaitError(request=None, capture=self.flood_seconds)
+            if channel not in self.channels:
+                raise ValueError(f"No channel named {channel}")
+        finally:
+            self.active -= 1
+
+        count = 0
+        for msg in reversed(self.channels[channel]):
+            if offset_id and msg.id >= offset_id:
+                continue
+            if msg.id <= min_id:
+                break
+            if limit is not None and count >= limit:
+                break
+            count += 1
+            yield msg
@@ -0,0 +1,75 @@
+import json
+import os
+import sqlite3
+
+
+class FetchState:
+    """Highest message id seen per channel, so later runs only fetch new posts.
+
+    Marks are kept per scope (a bot user, or "default" for the batch script)
+    because a post that did not match one keyword set may match another.
+    They are rows in an SQLite file, so committing a search upserts only its
+    channels instead of rewriting every scope's marks; a JSON file left by
+    the old storage is imported into it once.
+    """
+
+    def __init__(self, db_path="fetch_state.db"):
+        self.db_path = db_path
+        is_new = not os.path.exists(db_path)
+        self.db = sqlite3.connect(db_path)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS marks (
+                scope TEXT NOT NULL,
+                channel TEXT NOT NULL,
+                message_id INTEGER NOT NULL,
+                PRIMARY KEY (scope, channel)
+            ) WITHOUT ROWID
+        """)
+        self.db.commit()
+
+        json_file = f"{os.path.splitext(db_path)[0]}.json"
+        if is_new and os.path.exists(json_file):
+            self.import_json(json_file)
+            print(f"📌 Imported {json_file} into {db_path}")
+
+    def close(self):
+        self.db.close()
+
+    def import_json(self, json_file):
+        """Load the marks of a state file written by the old JSON storage"""
+        with open(json_file, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        with self.db:
+            self._upsert([(scope, channel, message_id)
+                          for scope, marks in state.items() for channel, message_id in marks.items()])
+
+    def _upsert(self, rows):
+        self.db.executemany(
+            "INSERT INTO marks (scope, channel, message_id) VALUES (?, ?, ?) "
+            "ON CONFLICT (scope, channel) DO UPDATE SET message_id = MAX(message_id, excluded.message_id)",
+            rows,
+        )
+
+    def get_min_id(self, scope, channel):
+        row = self.db.execute("SELECT message_id FROM marks WHERE scope = ? AND channel = ?",
+                              (str(scope), channel)).fetchone()
+        return row[0] if row else 0
+
+    def update(self, scope, channel, message_id):
+        with self.db:
+            self._upsert([(str(scope), channel, message_id)])
+
+    def commit(self, scope, newest_ids):
+        """Advance the marks of a scope once its matches have been delivered.
+
+        newest_ids is what stream_matches filled in; channels whose fetch gave
+        up (None) keep their old mark.
+        """
+        with self.db:
+            self._upsert([(str(scope), channel, message_id)
+                          for channel, message_id in newest_ids.items() if message_id])
+
+    def reset(self, scope):
+        """Forget the marks of a scope so the next fetch is a full rescan"""
+        with self.db:
+            self.db.execute("DELETE FROM marks WHERE scope = ?", (str(scope),))
@@ -1,86 +1,172 @@
-from io import BytesIO
+import os
 from datetime import datetime
-from report_generator import generate_html_report
-from telethon.tl.types import DocumentAttributeFilename
+from functools import partial
 
-async def forward_messages(client, messages, destination):
-    if not messages:
-        return
+from aggregate import MatchAggregate
+from report_delivery import package_report, upload_parts
+from report_generator import build_report
+from send_queue import SendQueue
+from upload_cache import upload_cache
 
-    resolved = "me" if destination in ["saved_messages", "me"] else destination
+def resolve_destination(destination):
+    return "me" if destination in ["saved_messages", "me"] else destination
 
-    try:
-        # ✅ Generate HTML report
-        html_content = generate_html_report(messages)
-        html_file = BytesIO(html_content.encode("utf-8"))
-        html_filename = f"job_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.html"
-
-        # ✅ Send HTML report
-        await client.send_file(
-            resolved,
-            html_file,
-            caption=f"📄 Job Report - {len(messages)} jobs found! Open in browser for best view.",
-            file_name=html_filename,
-            force_document=True,
-            attributes=[
-                DocumentAttributeFilename(file_name=html_filename)
-            ]
-        )
-
-        # ✅ Send summary message
-        summary = generate_summary_message(messages)
-        await client.send_message(resolved, summary)
-
-        print(f"✅ Sent HTML report with {len(messages)} jobs to {resolved}")
 
-    except Exception as e:
-        print(f"❌ Failed to send HTML report to {resolved}: {e}")
-        # 🔁 Only send fallback if HTML failed
-        await send_text_fallback(client, messages, resolved)
+def resolve_destinations(destination):
+    """forward_to may name one chat or a list of them"""
+    destinations = destination if isinstance(destination, (list, tuple)) else [destination]
+    return [resolve_destination(d) for d in destinations]
+
+
+def report_filename():
+    return f"job_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.html"
+
+
+async def send_report(client, parts, job_count, summary, resolved):
+    # ✅ Send HTML report; the parts are packaged once and the upload is reused per chat
+    await upload_parts(client, resolved, parts,
+                       f"📄 Job Report - {job_count} jobs found! Open in browser for best view.")
+
+    # ✅ Send summary message
+    await client.send_message(resolved, summary)
+
+    print(f"✅ Sent HTML report with {job_count} jobs to {resolved}")
+
+
+async def forward_messages(client, messages, destination, config=None, aggregate=None):
+    """Send the report for a list of matches; pass the aggregate if stream_matches already filled it"""
+    if not messages:
+        return
+
+    report = build_report(messages, aggregate=aggregate)
+    parts = package_report(report, report_filename(), config)
+    summary = format_summary_message(report.aggregate)
+
+    for resolved in resolve_destinations(destination):
+        try:
+            await send_report(client, parts, len(messages), summary, resolved)
+
+        except Exception as e:
+            print(f"❌ Failed to send HTML report to {resolved}: {e}")
+            # 🔁 Only send fallback if HTML failed
+            await send_text_fallback(client, messages, resolved)
+    print(upload_cache.format_stats())
+
+
+async def forward_report(client, report, destination, text_file=None, config=None):
+    """Send a report built while streaming; falls back to the saved text file.
+
+    Returns True when every destination got the report or its fallback.
+    """
+    if not report.job_count:
+        return True
+
+    parts = package_report(report, report_filename(), config)
+    summary = format_summary_message(report.aggregate)
+    failed = 0
+
+    for resolved in resolve_destinations(destination):
+        try:
+            await send_report(client, parts, report.job_count, summary, resolved)
+
+        except Exception as e:
+            print(f"❌ Failed to send HTML report to {resolved}: {e}")
+            failed += 1
+            if text_file:
+                try:
+                    with open(text_file, 'rb') as f:
+                        data = f.read()
+                    await upload_cache.send_file(client, resolved, data, os.path.basename(text_file),
+                                                 caption=f"📄 Job Posts ({report.job_count})")
+                    print(f"✅ Sent text fallback with {report.job_count} messages")
+                    failed -= 1
+                except Exception as e:
+                    print(f"❌ Text fallback also failed: {e}")
+    print(upload_cache.format_stats())
+    return not failed
 
 
 async def send_text_fallback(client, messages, destination):
     """Fallback to text format if HTML fails"""
     try:
-        content = ""
-        for msg in messages:
-            content += f"[{msg['channel']}] {msg['date']}\n{msg['text']}\n\n{'-' * 40}\n\n"
-
-        file_data = BytesIO(content.encode("utf-8"))
+        content = "".join(f"[{msg['channel']}] {msg['date']}\n{msg['text']}\n\n{'-' * 40}\n\n" for msg in messages)
         filename = f"filtered_jobs_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
 
-        await client.send_file(destination, file_data, caption=f"📄 Job Posts ({len(messages)})", file_name=filename)
+        await upload_cache.send_file(client, destination, content.encode("utf-8"), filename,
+                                     caption=f"📄 Job Posts ({len(messages)})")
         print(f"✅ Sent text fallback with {len(messages)} messages")
     except Exception as e:
         print(f"❌ Text fallback also failed: {e}")
 
 
+FORWARD_BATCH_SIZE = 100  # Most ids one forward_messages request takes
+
+
+class PostIds:
+    """Collects the (channel, id) of each match for native forwarding"""
+
+    def __init__(self):
+        self.ids = {}
+        self.count = 0
+
+    def add(self, job):
+        self.ids.setdefault(job['channel'], []).append(job['id'])
+        self.count += 1
+
+
+async def forward_originals(client, posts, destination, queue=None):
+    """Forward the original posts, up to 100 per request and source channel.
+
+    `posts` maps each channel to the ids of its matches (see PostIds). Every
+    request goes through the SendQueue, which keeps them in order per
+    destination and handles flood waits. Returns the number of posts sent
+    and the number that could not be forwarded.
+    """
+    queue = queue or SendQueue()
+    requests = []
+    for resolved in resolve_destinations(destination):
+        for channel, ids in posts.items():
+            ids = sorted(set(ids))  # Oldest first, as in the channel
+            for start in range(0, len(ids), FORWARD_BATCH_SIZE):
+                batch = ids[start:start + FORWARD_BATCH_SIZE]
+                send = partial(client.forward_messages, resolved, batch, from_peer=channel)
+                requests.append((resolved, channel, batch, queue.submit(resolved, send)))
+
+    forwarded = failed = 0
+    for resolved, channel, batch, future in requests:
+        try:
+            await future
+            forwarded += len(batch)
+        except Exception as e:
+            failed += len(batch)
+            print(f"❌ Failed to forward {len(batch)} posts from {channel} to {resolved}: {e}")
+    print(f"✅ Forwarded {forwarded} posts in {len(requests)} requests")
+    return forwarded, failed
+
+
 def generate_summary_message(messages):
     """Generate a quick summary message"""
-    if not messages:
-        return "❌ No jobs found"
+    return format_summary_message(MatchAggregate.of(messages))
+
 
-    # Group by channel
-    channels = {}
-    total_with_contact = 0
-    all_keywords = []
+def format_summary_message(aggregate):
+    """Summary text from the running totals, so callers that stream matches need not keep them"""
+    job_count = aggregate.job_count
+    if not job_count:
+        return "❌ No jobs found"
 
-    for msg in messages:
-        channel = msg['channel']
-        channels[channel] = channels.get(channel, 0) + 1
-        if msg.get('has_contact'):
-            total_with_contact += 1
-        all_keywords.extend(msg.get('matched_keywords', []))
+    total_with_contact = aggregate.with_contact
+    channels = aggregate.channel_counts
+    keyword_counts = aggregate.keyword_counts
 
     # Most common keywords
-    from collections import Counter
-    top_keywords = Counter(all_keywords).most_common(3)
+    top_keywords = keyword_counts.most_common(3)
 
     summary = f"""```🎯 **Job Search Results**
 
 📊 **Summary:**
-• Total jobs found: {len(messages)}
-• Jobs with contact info: {total_with_contact} ({total_with_contact / len(messages) * 100:.1f}%)
+• Total jobs found: {job_count}
+• Jobs with contact info: {total_with_contact} ({total_with_contact / job_count * 100:.1f}%)
 • Channels searched: {len(channels)}
 
 📈 **Top Channels:**
@@ -0,0 +1,187 @@
+import argparse
+import re
+import sqlite3
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+
+PERIOD_PATTERN = re.compile(r'\b(?:last|past)\s+(\d+)\s+(day|week|month)s?\b|\b(today|yesterday)\b', re.IGNORECASE)
+CHANNEL_PATTERN = re.compile(r'(?<!\w)@\w+')
+CONTACT_PATTERN = re.compile(r'\b(?:with\s+)?contacts?\b', re.IGNORECASE)
+TERM_PATTERN = re.compile(r'[\w+#.]+')
+
+
+class JobArchive:
+    """Local SQLite FTS5 archive of every matched job, searchable offline"""
+
+    def __init__(self, db_path="job_archive.db"):
+        self.db_path = db_path
+        self.db = sqlite3.connect(db_path)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                rowid INTEGER PRIMARY KEY,
+                channel TEXT NOT NULL,
+                id INTEGER NOT NULL,
+                date TEXT,
+                keywords TEXT,
+                has_contact INTEGER,
+                url TEXT,
+                text TEXT,
+                UNIQUE (channel, id)
+            );
+            CREATE INDEX IF NOT EXISTS jobs_date ON jobs (date);
+            CREATE VIRTUAL TABLE IF NOT EXISTS jobs_fts USING fts5(
+                text, channel, keywords, content='jobs', content_rowid='rowid'
+            );
+        """)
+
+    def close(self):
+        self.db.close()
+
+    def add(self, messages):
+        """Archive matches; posts already archived are left as they are"""
+        added = 0
+        for msg in messages:
+            cursor = self.db.execute(
+                "INSERT OR IGNORE INTO jobs (channel, id, date, keywords, has_contact, url, text) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (msg['channel'], msg['id'], msg['date'], ", ".join(msg.get('matched_keywords', [])),
+                 int(bool(msg.get('has_contact'))), msg.get('url'), msg['text'])
+            )
+            if cursor.rowcount:
+                self.db.execute(
+                    "INSERT INTO jobs_fts (rowid, text, channel, keywords) VALUES (?, ?, ?, ?)",
+                    (cursor.lastrowid, msg['text'], msg['channel'], ", ".join(msg.get('matched_keywords', [])))
+                )
+                added += 1
+        self.db.commit()
+        return added
+
+    def __len__(self):
+        return self.db.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+
+    @staticmethod
+    def parse_query(query: str) -> Dict:
+        """Split "golang remote @jobs with contact last 30 days" into filters and search terms"""
+        filters = {"since": None, "channels": [], "has_contact": False}
+
+        period = PERIOD_PATTERN.search(query)
+        if period:
+            count, unit, named = period.groups()
+            now = datetime.now(timezone.utc)
+            if named:
+                days = 0 if named.lower() == "today" else 1
+                start = now.replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=days)
+            else:
+                start = now - timedelta(days=int(count) * {"day": 1, "week": 7, "month": 30}[unit.lower()])
+            filters["since"] = str(start)
+            query = PERIOD_PATTERN.sub(" ", query)
+
+        filters["channels"] = CHANNEL_PATTERN.findall(query)
+        query = CHANNEL_PATTERN.sub(" ", query)
+
+        if CONTACT_PATTERN.search(query):
+            filters["has_contact"] = True
+            query = CONTACT_PATTERN.sub(" ", query)
+
+        # Quote every term so words like "C++" or "AND" never become FTS syntax
+        filters["terms"] = ['"' + term.replace('"', '""') + '"' for term in TERM_PATTERN.findall(query)]
+        return filters
+
+    def search(self, query: str, limit=20, channels=None) -> List[Dict]:
+        """Run an ad-hoc query; `channels` limits it to those channels when the query names none"""
+        filters = self.parse_query(query)
+        if not filters["channels"] and channels:
+            filters["channels"] = list(channels)
+        where = []
+        params = []
+
+        if filters["terms"]:
+            where.append("jobs_fts MATCH ?")
+            params.append(" ".join(filters["terms"]))
+        if filters["since"]:
+            where.append("jobs.date >= ?")
+            params.append(filters["since"])
+        if filters["channels"]:
+            where.append(f"jobs.channel IN ({', '.join('?' * len(filters['channels']))})")
+            params.extend(filters["channels"])
+        if filters["has_contact"]:
+            where.append("jobs.has_contact = 1")
+
+        if filters["terms"]:
+            sql = ("SELECT jobs.channel, jobs.id, jobs.date, jobs.keywords, jobs.has_contact, jobs.url, jobs.text "
+                   "FROM jobs_fts JOIN jobs ON jobs.rowid = jobs_fts.rowid")
+            order = "ORDER BY bm25(jobs_fts), jobs.date DESC"
+        else:
+            sql = "SELECT channel, id, date, keywords, has_contact, url, text FROM jobs"
+            order = "ORDER BY date DESC"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += f" {order} LIMIT ?"
+        params.append(limit)
+
+        return [
+            {
+                "channel": channel,
+                "id": msg_id,
+                "date": date,
+                "matched_keywords": keywords.split(", ") if keywords else [],
+                "has_contact": bool(has_contact),
+                "url": url,
+                "text": text,
+                "word_count": len(text.split()),
+            }
+            for channel, msg_id, date, keywords, has_contact, url, text in self.db.execute(sql, params)
+        ]
+
+
+def format_search_results(results, limit=10):
+    """Short text listing for the bot and the command line"""
+    if not results:
+        return "❌ No archived jobs match that query"
+
+    lines = [f"🗄️ **{len(results)} archived jobs**\n"]
+    for job in results[:limit]:
+        preview = " ".join(job["text"].split())[:100]
+        contact = " 📞" if job["has_contact"] else ""
+        lines.append(f"• {job['date'][:10]} {job['channel']}{contact}: {preview}\n{job['url']}\n")
+    if len(results) > limit:
+        lines.append(f"… and {len(results) - limit} more")
+    return "\n".join(lines)
+
+
+def test_archive_search():
+    archive = JobArchive(":memory:")
+    now = datetime.now(timezone.utc)
+
+    def job(channel, msg_id, text, days_ago, has_contact=False):
+        return {"channel": channel, "id": msg_id, "text": text, "date": str(now - timedelta(days=days_ago)),
+                "matched_keywords": ["Golang"] if "golang" in text.lower() else ["Python"],
+                "has_contact": has_contact, "url": f"https://t.me/{channel[1:]}/{msg_id}"}
+
+    assert archive.add([
+        job("@go_jobs", 1, "Remote Golang backend developer", 3, has_contact=True),
+        job("@go_jobs", 2, "Golang developer, office in Berlin", 5),
+        job("@remote", 3, "Remote Golang SRE", 60),
+        job("@remote", 4, "Remote Python and C++ engineer", 1),
+    ]) == 4
+    assert archive.add([job("@go_jobs", 1, "Remote Golang backend developer", 3)]) == 0
+
+    assert [r["id"] for r in archive.search("golang remote last 30 days")] == [1]
+    assert {r["id"] for r in archive.search("golang")} == {1, 2, 3}
+    assert [r["id"] for r in archive.search("golang @go_jobs with contact")] == [1]
+    assert [r["id"] for r in archive.search("C++")] == [4]
+    assert [r["id"] for r in archive.search("last 2 weeks")] == [4, 1, 2]
+    print("✅ Archive queries return the expected jobs")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Search archived job matches offline")
+    parser.add_argument("query", nargs="*", help='e.g. golang remote last 30 days (no query runs the self-test)')
+    parser.add_argument("--db", default="job_archive.db")
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.query:
+        print(format_search_results(JobArchive(args.db).search(" ".join(args.query), args.limit), args.limit))
+    else:
+        test_archive_search()
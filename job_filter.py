@@ -1,6 +1,144 @@
+import asyncio
+import itertools
 import re
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
 from typing import List, Dict, Any
 
+from telethon.errors import FloodWaitError
+
+from dedup import DuplicateDetector, minhash
+from entity_cache import STALE_PEER_ERRORS
+from job_match import JobMatch
+from rate_limiter import TokenBucket
+
+SPECIAL_CHARS = re.compile(r'[./\-+#]')
+# Distinct keyword lists whose compiled matchers are kept for reuse
+MATCHER_CACHE_SIZE = 1024
+
+
+def _build_trie_pattern(literals):
+    """Build a regex alternation shaped like a trie so shared prefixes are tried once"""
+    trie = {}
+    for literal in literals:
+        node = trie
+        for char in literal:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        return f'(?:{body})?' if '' in node else body
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    """Compiled matcher that scans a message once for all keywords.
+
+    Every keyword regex starts with a literal prefix (the keyword up to its
+    first special char). A single case-insensitive trie scan finds each
+    position where one of those prefixes occurs, and only the keywords whose
+    prefix occurs there are confirmed with their own anchored regex, so the
+    smart matching rules stay exactly the same.
+    """
+
+    def __init__(self, keywords: List[Dict]):
+        self.keywords = keywords
+        self._by_literal: Dict[str, List[int]] = {}
+        self._unanchored: List[int] = []
+
+        for i, kw in enumerate(keywords):
+            literal = kw['literal'].lower()
+            if literal and len(literal) == len(kw['literal']):
+                self._by_literal.setdefault(literal, []).append(i)
+            else:
+                self._unanchored.append(i)
+
+        self._scanner = None
+        if self._by_literal:
+            self._scanner = re.compile(f"(?i)(?=({_build_trie_pattern(self._by_literal)}))")
+
+    def __iter__(self):
+        return iter(self.keywords)
+
+    def __len__(self):
+        return len(self.keywords)
+
+    def __getitem__(self, index):
+        return self.keywords[index]
+
+    def _candidates_at(self, prefix: str) -> List[int]:
+        """Keyword indexes whose literal is a case-insensitive prefix of the scanned text"""
+        lowered = prefix.lower()
+        if len(lowered) != len(prefix) or lowered not in self._by_literal:
+            # Unusual case folding (e.g. 'ſ' or 'İ'); let the regexes decide
+            return [i for indexes in self._by_literal.values() for i in indexes]
+
+        candidates = []
+        for end in range(1, len(lowered) + 1):
+            candidates.extend(self._by_literal.get(lowered[:end], ()))
+        return candidates
+
+    def find(self, text: str) -> List[str]:
+        """Return the original form of every keyword found in text, in keyword order"""
+        found = [False] * len(self.keywords)
+
+        for i in self._unanchored:
+            found[i] = bool(self.keywords[i]['regex'].search(text))
+
+        if self._scanner is not None:
+            for hit in self._scanner.finditer(text):
+                pos = hit.start()
+                for i in self._candidates_at(hit.group(1)):
+                    if not found[i] and self.keywords[i]['regex'].match(text, pos):
+                        found[i] = True
+
+        return [kw['original'] for kw, hit in zip(self.keywords, found) if hit]
+
+    def find_with_spans(self, text: str):
+        """Like find, but also return the (start, end) of every keyword occurrence.
+
+        Scanning does not stop at the first hit of a keyword, so this is only
+        worth it for posts that are kept, e.g. to highlight them in the report.
+        """
+        found = [False] * len(self.keywords)
+        spans = []
+
+        for i in self._unanchored:
+            for match in self.keywords[i]['regex'].finditer(text):
+                found[i] = True
+                spans.append(match.span())
+
+        if self._scanner is not None:
+            for hit in self._scanner.finditer(text):
+                pos = hit.start()
+                for i in self._candidates_at(hit.group(1)):
+                    match = self.keywords[i]['regex'].match(text, pos)
+                    if match:
+                        found[i] = True
+                        spans.append(match.span())
+
+        return [kw['original'] for kw, hit in zip(self.keywords, found) if hit], merge_spans(spans)
+
+
+def merge_spans(spans):
+    """Sort spans and join the ones that overlap, so highlights never nest"""
+    merged = []
+    for start, end in sorted(spans):
+        if start == end:
+            continue
+        if merged and start < merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return tuple(merged)
+
 
 def normalize_keywords(keywords):
     """Normalize and precompile regex patterns for smart matching"""
@@ -12,7 +150,8 @@ def normalize_keywords(keywords):
 
         is_acronym = kw.isupper() and len(kw) <= 5
         is_short = len(kw) <= 3
-        has_special_chars = bool(re.search(r'[./\-+#]', kw))
+        has_special_chars = bool(SPECIAL_CHARS.search(kw))
+        literal = kw
 
         # Build regex pattern based on keyword type
         if is_acronym:
@@ -23,101 +162,510 @@ def normalize_keywords(keywords):
             # Escape all parts and allow optional whitespace around symbols
             flexible = re.sub(r'([./+\-#])', r'\\s*\1\\s*', re.escape(kw))
             pattern = re.compile(rf'(?i)(?<!\w){flexible}(?!\w)')
+            literal = SPECIAL_CHARS.split(kw, 1)[0]
         else:
             pattern = re.compile(re.escape(kw), re.IGNORECASE)
 
         normalized.append({
             'original': kw,
-            'regex': pattern
+            'regex': pattern,
+            'literal': literal
         })
 
-    return normalized
+    return KeywordMatcher(normalized)
+
+
+@lru_cache(maxsize=MATCHER_CACHE_SIZE)
+def _cached_matcher(keywords):
+    return normalize_keywords(keywords)
+
+
+def keyword_key(keywords):
+    """The keywords as normalize_keywords will read them, for use as a cache key"""
+    return tuple(kw.strip() for kw in keywords if kw.strip())
+
+
+def compiled_matcher(keywords):
+    """Shared KeywordMatcher for a keyword list.
+
+    Matchers never change once built, so users whose keywords normalize to
+    the same tuple share one, and a changed config only compiles on its
+    first use.
+    """
+    return _cached_matcher(keyword_key(keywords))
 
 def is_keyword_match(text: str, keyword_info: Dict) -> bool:
     return bool(keyword_info['regex'].search(text))
 
 def find_matched_keywords(text: str, normalized_keywords: List[Dict]) -> List[str]:
     """Find all keywords that match in the text"""
+    if isinstance(normalized_keywords, KeywordMatcher):
+        return normalized_keywords.find(text)
+
     matched = []
     for kw_info in normalized_keywords:
         if is_keyword_match(text, kw_info):
             matched.append(kw_info['original'])  # Return original case
     return matched
 
+def find_keyword_spans(text: str, normalized_keywords: List[Dict]):
+    """Matched keywords plus the merged spans where they occur in text"""
+    if isinstance(normalized_keywords, KeywordMatcher):
+        return normalized_keywords.find_with_spans(text)
+
+    matched = []
+    spans = []
+    for kw_info in normalized_keywords:
+        hits = [match.span() for match in kw_info['regex'].finditer(text)]
+        if hits:
+            matched.append(kw_info['original'])
+            spans.extend(hits)
+    return matched, merge_spans(spans)
+
 
-async def fetch_and_filter_messages(client, config):
+CONTACT_PATTERN = re.compile(r'@\w+|https?://|t\.me/|\+\d+|\b\d{10,}\b|contact|apply|email', re.IGNORECASE)
+
+
+def build_result(channel, msg_id, text, date, matched_keywords, spans=None):
+    return JobMatch(channel, msg_id, text, date, matched_keywords, bool(CONTACT_PATTERN.search(text)),
+                    spans=spans)
+
+
+def match_rows(channel, rows, keywords, signatures=False):
+    """Match a batch of (id, text, date) rows, with their MinHash if asked; runs inside the matching pool"""
     results = []
-    channels = config["channels"]
-    keywords = normalize_keywords(config["keywords"])
-    limit = config.get("message_limit", 50)
+    for msg_id, text, date in rows:
+        matched_keywords, spans = find_keyword_spans(text, keywords)
+        if matched_keywords:  # Only if keywords match
+            result = build_result(channel, msg_id, text, date, matched_keywords, spans)
+            if signatures:
+                result.signature = minhash(text)
+            results.append(result)
+    return results
 
-    print(f"🔍 Searching with keywords: {[kw['original'] for kw in keywords]}")
 
-    for channel in channels:
-        try:
-            print(f"📡 Searching in {channel}...")
-            message_count = 0
+class MatchingPool:
+    """Runs keyword matching on batches of posts away from the event loop.
 
-            async for msg in client.iter_messages(channel, limit=limit):
+    "process" matches in worker processes, "thread" in a worker thread (the
+    regex engine holds the GIL, but the loop still gets a turn every switch
+    interval instead of waiting for the whole batch) and "inline" on the
+    loop itself.
+    """
+
+    def __init__(self, kind="thread", batch_size=200, workers=None):
+        if kind not in ("process", "thread", "inline"):
+            raise ValueError(f"Unknown match_executor: {kind}")
+        self.kind = kind
+        self.batch_size = batch_size
+        self.workers = workers
+        self._executor = None
+
+    def executor(self):
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="matching")
+        return self._executor
+
+    async def match(self, channel, rows, keywords, signatures=False):
+        if self.kind == "inline":
+            return match_rows(channel, rows, keywords, signatures)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor(), match_rows, channel, rows, keywords, signatures)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+_matching_pools: Dict[tuple, MatchingPool] = {}
+
+
+def get_matching_pool(kind="thread", batch_size=200):
+    """Pools are shared so worker processes outlive a single search"""
+    key = (kind, batch_size)
+    if key not in _matching_pools:
+        _matching_pools[key] = MatchingPool(kind, batch_size)
+    return _matching_pools[key]
+
+
+async def fetch_channel_messages(client, channel, keywords, limit, limiter, flood_retries=3, min_id=0, cache=None,
+                                 pool=None, emit=None, entities=None, signatures=False):
+    """Fetch and filter one channel; returns the match count and newest id seen (None if it gave up)"""
+    pool = pool or get_matching_pool("inline")
+    match_count = 0
+    batch = []
+    message_count = 0
+    offset_id = 0
+    attempts = 0
+    newest_id = min_id
+    complete = True
+    peer = await entities.resolve(client, channel, limiter) if entities is not None else channel
+    stale_peer_retried = False
+
+    async def flush(rows):
+        nonlocal match_count
+        matches = await pool.match(channel, rows, keywords, signatures)
+        match_count += len(matches)
+        if matches and emit is not None:
+            await emit(matches)
+
+    print(f"📡 Searching in {channel}...")
+
+    while message_count < limit:
+        if cache is not None:
+            messages = cache.iter_messages(client, channel, limit - message_count, offset_id, min_id, limiter, peer)
+        else:
+            await limiter.acquire()
+            messages = client.iter_messages(peer, limit=limit - message_count, offset_id=offset_id, min_id=min_id)
+
+        try:
+            async for msg in messages:
                 message_count += 1
+                offset_id = msg.id
+                newest_id = max(newest_id, msg.id)
+                if cache is None and message_count % 100 == 0:
+                    # iter_messages requests a new chunk every 100 messages
+                    await limiter.acquire()
+
                 if msg.message:
-                    matched_keywords = find_matched_keywords(msg.message, keywords)
-
-                    if matched_keywords:  # Only if keywords match
-                        # Check for contact information
-                        has_contact = bool(re.search(
-                            r'@\w+|https?://|t\.me/|\+\d+|\b\d{10,}\b|contact|apply|email',
-                            msg.message,
-                            re.IGNORECASE
-                        ))
-
-                        results.append({
-                            "channel": channel,
-                            "text": msg.message,
-                            "date": str(msg.date),
-                            "id": msg.id,
-                            "url": f"https://t.me/{channel.replace('@', '')}/{msg.id}",
-                            "matched_keywords": matched_keywords,
-                            "word_count": len(msg.message.split()),
-                            "has_contact": has_contact
-                        })
-
-            print(
-                f"✅ {channel}: Found {len([r for r in results if r['channel'] == channel])} matches from {message_count} messages")
-
-        except Exception as e:
-            print(f"❌ Error with {channel}: {e}")
+                    batch.append((msg.id, msg.message, str(msg.date)))
+                    if len(batch) >= pool.batch_size:
+                        await flush(batch)
+                        batch = []
+            break
+
+        except FloodWaitError as e:
+            attempts += 1
+            limiter.pause(e.seconds)
+            if attempts > flood_retries:
+                print(f"❌ {channel}: giving up after {attempts} flood waits")
+                complete = False
+                break
+            print(f"⏳ {channel}: flood wait of {e.seconds}s, retrying ({attempts}/{flood_retries})")
+
+        except STALE_PEER_ERRORS:
+            if entities is None or peer is channel or stale_peer_retried:
+                raise
+            stale_peer_retried = True
+            entities.invalidate(channel)
+            peer = await entities.resolve(client, channel, limiter)
+
+    if batch:
+        await flush(batch)
+
+    print(f"✅ {channel}: Found {match_count} matches from {message_count} messages")
+    return match_count, newest_id if complete else None
+
+
+_CHANNEL_DONE = object()
+
+
+async def stream_matches(client, config, limiter=None, fetch_state=None, state_key="default", cache=None,
+                         detector=None, archive=None, aggregate=None, entities=None, newest_ids=None):
+    """Yield matches from every configured channel as soon as they are found; fills newest_ids at the end"""
+    channels = list(dict.fromkeys(config["channels"]))  # A repeated channel would never report done twice
+    keywords = compiled_matcher(config["keywords"])
+    limit = config.get("message_limit", 50)
+    concurrency = asyncio.Semaphore(config.get("max_concurrent_channels", 5))
+    limiter = limiter or TokenBucket(config.get("requests_per_second", 2))
+    flood_retries = config.get("flood_wait_retries", 3)
+    full_rescan = config.get("full_rescan", False)
+    pool = get_matching_pool(config.get("match_executor", "thread"), config.get("match_batch_size", 200))
+    queue = asyncio.Queue(maxsize=config.get("stream_buffer", 100))
+    if config.get("deduplicate", True):
+        detector = detector or DuplicateDetector()
+    else:
+        detector = None
+
+    print(f"🔍 Searching with keywords: {[kw['original'] for kw in keywords]}")
+
+    async def emit(matches):
+        for match in matches:
+            await queue.put(match)
+
+    async def search_channel(channel):
+        min_id = 0
+        if fetch_state is not None and not full_rescan:
+            min_id = fetch_state.get_min_id(state_key, channel)
+
+        newest_id = None
+        async with concurrency:
+            try:
+                _, newest_id = await fetch_channel_messages(client, channel, keywords, limit, limiter, flood_retries,
+                                                            min_id, cache, pool, emit, entities,
+                                                            signatures=detector is not None)
+            except Exception as e:
+                print(f"❌ Error with {channel}: {e}")
+        await queue.put((_CHANNEL_DONE, channel, newest_id))
+
+    tasks = [asyncio.create_task(search_channel(channel)) for channel in channels]
+    done = {}
+    kept = {}
+    archive_batch = []
+
+    try:
+        while len(done) < len(channels):
+            item = await queue.get()
+            if isinstance(item, tuple) and item[0] is _CHANNEL_DONE:
+                done[item[1]] = item[2]
+                continue
 
+            if detector is not None and not detector.check(item, kept):
+                continue
+
+            if archive is not None:
+                archive_batch.append(item)
+                if len(archive_batch) >= 100:
+                    archive.add(archive_batch)
+                    archive_batch = []
+            if aggregate is not None:
+                aggregate.add(item)
+            yield item
+
+        if newest_ids is not None:
+            newest_ids.update(done)  # The caller commits them to its FetchState once the matches are delivered
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if archive is not None and archive_batch:
+            archive.add(archive_batch)
+
+
+async def fetch_and_filter_messages(client, config, limiter=None, fetch_state=None, state_key="default", cache=None,
+                                    detector=None, archive=None, aggregate=None, entities=None, newest_ids=None):
+    """Fetch matching posts from every configured channel, grouped in the configured channel order"""
+    order = {channel: i for i, channel in enumerate(config["channels"])}
+    results = [match async for match in stream_matches(client, config, limiter, fetch_state, state_key, cache,
+                                                       detector, archive, aggregate, entities, newest_ids)]
+    results.sort(key=lambda r: order[r["channel"]])
     return results
 
 
+TEST_KEYWORDS = ["IT", "Python", "javascript", "C++", ".NET", "UI/UX", "AI", "remote work"]
+
+TEST_TEXTS = [
+    "Looking for IT specialist",
+    "Need Python developer",
+    "JavaScript and Python skills required",
+    "C++ programmer wanted",
+    ".NET developer position",
+    "UI/UX designer needed",
+    "AI engineer remote position",
+    "Remote work available",
+    "This is a great opportunity",  # Should not match "IT" in "opportunity"
+    "Digital marketing position",  # Should not match "IT" in "Digital"
+    "C ++ developer needed",  # Should match C++
+    "DotNet and .NET experience",  # Should match .NET
+]
+
+
 # Test function to verify keyword matching
 def test_keyword_matching():
     """Test the keyword matching logic"""
-    test_keywords = ["IT", "Python", "javascript", "C++", ".NET", "UI/UX", "AI", "remote work"]
-    normalized = normalize_keywords(test_keywords)
-
-    test_texts = [
-        "Looking for IT specialist",
-        "Need Python developer",
-        "JavaScript and Python skills required",
-        "C++ programmer wanted",
-        ".NET developer position",
-        "UI/UX designer needed",
-        "AI engineer remote position",
-        "Remote work available",
-        "This is a great opportunity",  # Should not match "IT" in "opportunity"
-        "Digital marketing position",  # Should not match "IT" in "Digital"
-        "C ++ developer needed",  # Should match C++
-        "DotNet and .NET experience",  # Should match .NET
-    ]
+    normalized = normalize_keywords(TEST_KEYWORDS)
 
     print("🧪 Testing keyword matching:")
-    for text in test_texts:
+    for text in TEST_TEXTS:
         matches = find_matched_keywords(text, normalized)
         print(f"Text: '{text}' → Matches: {matches}")
 
 
+def test_matcher_parity():
+    """Check the single-pass matcher against the per-keyword regex loop"""
+    keywords = TEST_KEYWORDS + ["Node.js", "remote", "work", "Go", "golang", "ſkill", "İstanbul", "Работа"]
+    texts = TEST_TEXTS + [
+        "Remote work and remote-first teams, work from home",
+        "Golang / Go developer, Node.js or node . js",
+        "SKILL and ſkill, İSTANBUL office, РАБОТА for IT and it",
+        "",
+    ]
+    matcher = normalize_keywords(keywords)
+
+    for text in texts:
+        expected = find_matched_keywords(text, list(matcher))
+        actual = find_matched_keywords(text, matcher)
+        assert actual == expected, f"{text!r}: {actual} != {expected}"
+        assert find_keyword_spans(text, matcher) == find_keyword_spans(text, list(matcher)), text
+
+    print(f"✅ Matcher parity holds for {len(texts)} texts")
+
+
+def benchmark_keyword_matching(keyword_count=120, message_count=2000):
+    """Compare the per-keyword loop with the single-pass matcher"""
+    words = ("python senior developer remote team salary apply contact hiring "
+             "startup office benefits experience years backend frontend").split()
+    keywords = TEST_KEYWORDS + [f"skill{i}" for i in range(keyword_count - len(TEST_KEYWORDS))]
+    texts = [" ".join(words[(i + j) % len(words)] for j in range(150)) + f" skill{i % keyword_count} C++"
+             for i in range(message_count)]
+    matcher = normalize_keywords(keywords)
+    per_keyword = list(matcher)
+
+    start = time.perf_counter()
+    for text in texts:
+        find_matched_keywords(text, per_keyword)
+    loop_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for text in texts:
+        find_matched_keywords(text, matcher)
+    matcher_time = time.perf_counter() - start
+
+    print(f"⏱️ {message_count} messages × {len(keywords)} keywords: "
+          f"loop {loop_time:.3f}s, matcher {matcher_time:.3f}s ({loop_time / matcher_time:.1f}× faster)")
+
+
+async def test_concurrent_fetching():
+    """Fetch from a fake client with latency and flood errors"""
+    from fake_client import FakeTelegramClient
+
+    posts = {
+        f"@channel_{i}": [f"Python developer #{j}" if j % 2 else "Nothing here" for j in range(20)]
+        for i in range(8)
+    }
+    client = FakeTelegramClient(posts, latency=0.2, flood_errors={"@channel_3": 1})
+    config = {
+        "channels": list(posts) + ["@missing"],
+        "keywords": ["Python"],
+        "message_limit": 20,
+        "max_concurrent_channels": 4,
+        "requests_per_second": 50,
+        "deduplicate": False,
+    }
+
+    start = time.perf_counter()
+    results = await fetch_and_filter_messages(client, config)
+    elapsed = time.perf_counter() - start
+
+    channel_order = list(dict.fromkeys(r["channel"] for r in results))
+    assert channel_order == list(posts), channel_order
+    assert len(results) == 8 * 10, len(results)
+    assert client.max_active <= 4, client.max_active
+    print(f"✅ Fetched {len(posts)} channels in {elapsed:.2f}s "
+          f"(sequential would take ≥ {0.2 * client.requests:.2f}s)")
+
+    # A channel listed twice is searched once instead of hanging the stream
+    repeated = {**config, "channels": ["@channel_0", "@channel_0", "@channel_1"]}
+    results = await asyncio.wait_for(fetch_and_filter_messages(client, repeated), timeout=10)
+    assert len(results) == 2 * 10, len(results)
+
+
+async def test_incremental_fetching():
+    """Only new posts are fetched once a high-water mark is saved"""
+    import json
+    import os
+    import tempfile
+    from fake_client import FakeTelegramClient
+    from fetch_state import FetchState
+
+    client = FakeTelegramClient({"@jobs": ["Python dev", "Java dev", "Python lead"]})
+    config = {"channels": ["@jobs"], "keywords": ["Python"], "message_limit": 50}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        state_file = os.path.join(tmp, "fetch_state.db")
+
+        async def search(delivered=True, **options):
+            fetch_state, newest_ids = FetchState(state_file), {}
+            results = await fetch_and_filter_messages(client, {**config, **options}, fetch_state=fetch_state,
+                                                      newest_ids=newest_ids)
+            if delivered:
+                fetch_state.commit("default", newest_ids)
+            return results
+
+        first = await search()
+        assert len(first) == 2, first
+
+        client.post("@jobs", "Senior Python engineer")
+        # Marks only move once the results are delivered, so a failed delivery gets them again
+        undelivered = await search(delivered=False)
+        # A fresh FetchState reads the marks back, as after a restart
+        second = await search()
+        assert [r["text"] for r in undelivered] == [r["text"] for r in second] == ["Senior Python engineer"], second
+
+        third = await search()
+        assert third == [], third
+
+        rescan = await search(full_rescan=True)
+        assert len(rescan) == 3, rescan
+
+        # Marks saved by the old JSON storage are picked up once
+        with open(os.path.join(tmp, "old_state.json"), "w", encoding="utf-8") as f:
+            json.dump({"default": {"@jobs": 3}}, f)
+        assert FetchState(os.path.join(tmp, "old_state.db")).get_min_id("default", "@jobs") == 3
+
+    print("✅ Incremental fetching only returns new posts")
+
+
+async def test_failed_delivery_retry():
+    """A failed delivery leaves the duplicate index as it was, so a repost seen on retry is still delivered"""
+    import os
+    import tempfile
+    from fake_client import FakeTelegramClient
+
+    post = "Senior Python developer for a remote team, Django and Docker, apply via @hr_team"
+    client = FakeTelegramClient({"@a": [post], "@b": []}, flood_seconds=0)
+    config = {"channels": ["@a", "@b"], "keywords": ["Python"], "message_limit": 50, "flood_wait_retries": 0}
+
+    async def deliver(matches):
+        raise ConnectionError("Upload failed")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index_file = os.path.join(tmp, "dedup_index.json")
+        detector = DuplicateDetector(index_file)
+        first = await fetch_and_filter_messages(client, config, detector=detector)
+        try:
+            await deliver(first)
+            detector.save_index()
+        except ConnectionError:
+            pass
+
+        # On retry the original's channel fails and a repost of it turns up elsewhere
+        client.post("@b", post + " 🔥")
+        client.flood_errors["@a"] = 1
+        retry = await fetch_and_filter_messages(client, config, detector=DuplicateDetector(index_file))
+        assert [r["channel"] for r in first] == ["@a"] and [r["channel"] for r in retry] == ["@b"], retry
+
+    print("✅ A failed delivery is retried without losing matches to the duplicate index")
+
+
+async def benchmark_loop_latency(message_count=5000, channel_count=4):
+    """Measure event loop lag while a big search runs, per match_executor, with and without dedup"""
+    from fake_client import FakeTelegramClient
+    from utils import LoopLagProbe
+
+    words = "python senior developer remote team salary apply contact hiring startup office".split()
+    posts = {
+        f"@channel_{c}": [" ".join(words[(i + j) % len(words)] for j in range(150)) for i in range(message_count)]
+        for c in range(channel_count)
+    }
+    keywords = TEST_KEYWORDS + [f"skill{i}" for i in range(100)]
+
+    for kind, deduplicate in itertools.product(("inline", "thread", "process"), (False, True)):
+        client = FakeTelegramClient(posts)
+        config = {"channels": list(posts), "keywords": keywords, "message_limit": message_count,
+                  "requests_per_second": 1000, "match_executor": kind, "deduplicate": deduplicate}
+        async with LoopLagProbe(0.01) as probe:
+            start = time.perf_counter()
+            results = await fetch_and_filter_messages(client, config)
+            elapsed = time.perf_counter() - start
+
+        print(f"⏱️ {kind}{' + dedup' if deduplicate else ''}: {len(results)} matches in {elapsed:.2f}s, "
+              f"loop lag p99 {probe.p99(elapsed) * 1000:.0f}ms, max {probe.max(elapsed) * 1000:.0f}ms")
+
+    for pool in _matching_pools.values():
+        pool.shutdown()
+
+
 if __name__ == "__main__":
     # Run tests
-    test_keyword_matching()
\ No newline at end of file
+    test_keyword_matching()
+    test_matcher_parity()
+    benchmark_keyword_matching()
+    asyncio.run(test_concurrent_fetching())
+    asyncio.run(test_incremental_fetching())
+    asyncio.run(test_failed_delivery_retry())
+    asyncio.run(benchmark_loop_latency())
@@ -0,0 +1,125 @@
+import sys
+import tracemalloc
+from collections.abc import Mapping
+
+KEYS = ("channel", "text", "date", "id", "url", "matched_keywords", "word_count", "has_contact", "duplicates", "spans")
+# Keys that only show up in the mapping once they are set
+OPTIONAL_KEYS = ("duplicates", "spans")
+
+
+class JobMatch(Mapping):
+    """Compact record of one matched post.
+
+    Channel and keyword strings are interned so 100k matches share a handful
+    of string objects, and url and word_count are only computed when read.
+    It is also a read-only Mapping with the keys of the old result dicts, so
+    match["channel"] and match.get("url", "#") keep working everywhere.
+    signature, the MinHash computed by the matching worker, is not one of
+    the keys and is dropped once the DuplicateDetector has used it.
+    """
+
+    __slots__ = ("channel", "id", "text", "date", "matched_keywords", "has_contact", "duplicates", "spans",
+                 "signature", "_word_count")
+
+    def __init__(self, channel, msg_id, text, date, matched_keywords, has_contact, duplicates=None, spans=None,
+                 signature=None):
+        self.channel = sys.intern(channel)
+        self.id = msg_id
+        self.text = text
+        self.date = date
+        self.matched_keywords = tuple(sys.intern(keyword) for keyword in matched_keywords)
+        self.has_contact = has_contact
+        self.duplicates = duplicates
+        self.spans = spans  # (start, end) of keyword occurrences, when the matcher recorded them
+        self.signature = signature
+        self._word_count = None
+
+    def __reduce__(self):
+        # Rebuild through __init__ so strings are interned again in this process
+        return JobMatch, (self.channel, self.id, self.text, self.date, self.matched_keywords, self.has_contact,
+                          self.duplicates, self.spans, self.signature)
+
+    @property
+    def url(self):
+        return f"https://t.me/{self.channel.replace('@', '')}/{self.id}"
+
+    @property
+    def word_count(self):
+        if self._word_count is None:
+            self._word_count = len(self.text.split())
+        return self._word_count
+
+    def __getitem__(self, key):
+        if key not in KEYS:
+            raise KeyError(key)
+        value = getattr(self, key)
+        if value is None and key in OPTIONAL_KEYS:
+            raise KeyError(key)
+        return value
+
+    def __iter__(self):
+        return (key for key in KEYS if key not in OPTIONAL_KEYS or getattr(self, key) is not None)
+
+    def __len__(self):
+        return len(KEYS) - sum(getattr(self, key) is None for key in OPTIONAL_KEYS)
+
+    def setdefault(self, key, default=None):
+        """Only "duplicates" can be added after creation (see DuplicateDetector)"""
+        if key != "duplicates":
+            return self[key]
+        if self.duplicates is None:
+            self.duplicates = default
+        return self.duplicates
+
+    def __repr__(self):
+        return f"JobMatch({self.channel!r}, {self.id!r}, keywords={list(self.matched_keywords)!r})"
+
+
+def measure_match_memory(count=100_000):
+    """Compare the memory held by result dicts and JobMatch records"""
+    from job_filter import build_result
+
+    channels = [f"@channel_{i}" for i in range(20)]
+    keywords = ["Python", "remote work", "IT"]
+    texts = [f"Senior Python developer #{i}, remote work, apply via @hr" for i in range(count)]
+
+    def old_result(channel, msg_id, text):
+        return {
+            "channel": channel,
+            "text": text,
+            "date": "2025-01-01 00:00:00+00:00",
+            "id": msg_id,
+            "url": f"https://t.me/{channel.replace('@', '')}/{msg_id}",
+            "matched_keywords": keywords[:2],
+            "word_count": len(text.split()),
+            "has_contact": True,
+        }
+
+    for name, factory in (("dict", old_result),
+                          ("JobMatch", lambda channel, msg_id, text: build_result(
+                              channel, msg_id, text, "2025-01-01 00:00:00+00:00", keywords[:2]))):
+        tracemalloc.start()
+        results = [factory(channels[i % len(channels)], i, text) for i, text in enumerate(texts)]
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"💾 {count} matches as {name}: {current / 1024 / 1024:.1f} MiB (post texts excluded)")
+        del results
+
+
+def test_job_match_view():
+    import pickle
+
+    match = JobMatch("@remote_work", 42, "Remote Python job, apply now", "2025-01-01", ["Python"], True)
+    assert match["url"] == "https://t.me/remote_work/42" and match.get("word_count") == 5
+    assert match.get("duplicates", []) == [] and "duplicates" not in match
+    match.setdefault("duplicates", []).append("https://t.me/other/1")
+    assert dict(match)["duplicates"] == ["https://t.me/other/1"]
+
+    copy = pickle.loads(pickle.dumps(match))
+    assert copy == match and copy.channel is match.channel
+    print("✅ JobMatch behaves like the old result dict")
+
+
+if __name__ == "__main__":
+    test_job_match_view()
+    measure_match_memory()
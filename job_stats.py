@@ -0,0 +1,105 @@
+import os
+
+from aggregate import MatchAggregate
+from stats_store import StatsStore
+
+
+class JobStats:
+    """Job statistics backed by a StatsStore.
+
+    With save_to_file the counts are kept in an SQLite file next to
+    stats_file and survive restarts; a JSON file left by the old storage is
+    imported into it once. Otherwise they are kept in memory, unless an
+    open StatsStore (e.g. one user's scope of a shared one) is passed in.
+    """
+
+    def __init__(self, stats_file="job_stats.db", save_to_file=False, store=None):
+        self.stats_file = stats_file
+        self.save_to_file = save_to_file
+        self.pending = MatchAggregate()
+        self.store = store or self.load_stats()
+
+    def load_stats(self):
+        """Open the store, importing the old JSON stats on first use"""
+        if not self.save_to_file:
+            return StatsStore(":memory:")
+
+        stem = os.path.splitext(self.stats_file)[0]
+        db_path, json_file = f"{stem}.db", f"{stem}.json"
+        is_new = not os.path.exists(db_path)
+        store = StatsStore(db_path)
+        if is_new and os.path.exists(json_file):
+            store.import_json(json_file)
+            print(f"📊 Imported {json_file} into {db_path}")
+        return store
+
+    def add(self, msg):
+        """Count one matched message; written with the next save"""
+        self.pending.add(msg)
+
+    def add_aggregate(self, aggregate):
+        """Count a whole search from its MatchAggregate, without touching the matches"""
+        self.store.record(aggregate.job_count, aggregate.with_contact, aggregate.channel_counts,
+                          aggregate.keyword_counts)
+
+    def close(self):
+        self.save_stats()
+
+    def update_stats(self, messages):
+        """Update statistics with new messages"""
+        self.add_aggregate(MatchAggregate.of(messages))
+
+    def save_stats(self):
+        """Write the messages counted with add()"""
+        if self.pending.job_count:
+            self.add_aggregate(self.pending)
+            self.pending = MatchAggregate()
+
+    @property
+    def stats(self):
+        """All counts as one dict, in the shape of the old JSON file"""
+        self.save_stats()
+        return {
+            "total_jobs_found": self.store.total("total_jobs_found"),
+            "channels_stats": self.store.counts("channel"),
+            "keyword_stats": self.store.counts("keyword"),
+            "daily_stats": self.store.daily_counts(),
+            "jobs_with_contact": self.store.total("jobs_with_contact"),
+            "last_updated": self.store.total("last_updated", None),
+        }
+
+    def get_summary(self):
+        """Get a summary of statistics"""
+        self.save_stats()
+        total_jobs = self.store.total("total_jobs_found")
+        if not total_jobs:
+            return "📊 No jobs found yet. Start filtering to see stats!"
+
+        top_channels = self.store.top("channel")
+        top_keywords = self.store.top("keyword")
+        with_contact = self.store.total("jobs_with_contact")
+
+        # Recent activity: today and the 6 days before it
+        recent_total = self.store.recent_jobs(7)
+
+        summary = f"""
+📊 **Job Search Statistics**
+
+🎯 **Overall:**
+• Total jobs found: {total_jobs}
+• Jobs with contact info: {with_contact} ({with_contact / total_jobs * 100:.1f}%)
+• Last updated: {self.store.total("last_updated", "Never")[:16]}
+
+📈 **Recent Activity (7 days):**
+• Jobs found: {recent_total}
+
+🏆 **Top Performing Channels:**
+"""
+        for channel, count in top_channels:
+            summary += f"• {channel}: {count} jobs\n"
+
+        summary += f"\n🔥 **Most Matched Keywords:**\n"
+        for keyword, count in top_keywords:
+            summary += f"• {keyword}: {count} matches\n"
+
+        return summary
@@ -0,0 +1,163 @@
+import random
+import time
+from typing import Dict, List
+
+from job_filter import KeywordMatcher, normalize_keywords
+
+
+class KeywordIndex:
+    """Inverted index of every user's keywords, scoped by channel.
+
+    Each channel keeps keyword -> subscribed users and one KeywordMatcher over
+    the distinct keywords followed there, so a post is scanned once no matter
+    how many users follow the channel. Updating a user only marks the
+    channels they touch for a lazy matcher rebuild.
+    """
+
+    def __init__(self):
+        self._keyword_info: Dict[str, Dict] = {}
+        self._channels: Dict[str, Dict[str, set]] = {}
+        self._matchers: Dict[str, KeywordMatcher] = {}
+        self._user_channels: Dict[int, List[str]] = {}
+        self._user_keywords: Dict[int, Dict[str, int]] = {}
+
+    def __len__(self):
+        return len(self._user_keywords)
+
+    @property
+    def channels(self):
+        return list(self._channels)
+
+    def user_channels(self, user_id):
+        return self._user_channels.get(user_id, [])
+
+    def _info(self, keyword):
+        if keyword not in self._keyword_info:
+            self._keyword_info[keyword] = normalize_keywords([keyword])[0]
+        return self._keyword_info[keyword]
+
+    def set_user(self, user_id, config):
+        """Add a user or replace their channels and keywords"""
+        self.remove_user(user_id)
+
+        # Keep the first position of each keyword so results follow the user's order
+        positions = {}
+        for keyword in config["keywords"]:
+            keyword = keyword.strip()  # As normalize_keywords does, without compiling anything
+            if keyword:
+                positions.setdefault(keyword, len(positions))
+        channels = list(dict.fromkeys(config["channels"]))
+
+        for channel in channels:
+            subscriptions = self._channels.setdefault(channel, {})
+            for keyword in positions:
+                subscriptions.setdefault(keyword, set()).add(user_id)
+            self._matchers.pop(channel, None)
+
+        self._user_channels[user_id] = channels
+        self._user_keywords[user_id] = positions
+
+    def remove_user(self, user_id):
+        positions = self._user_keywords.pop(user_id, None)
+        if positions is None:
+            return
+
+        for channel in self._user_channels.pop(user_id):
+            subscriptions = self._channels[channel]
+            for keyword in positions:
+                users = subscriptions[keyword]
+                users.discard(user_id)
+                if not users:
+                    del subscriptions[keyword]
+            if not subscriptions:
+                del self._channels[channel]
+            self._matchers.pop(channel, None)
+
+    def matcher_for(self, channel):
+        matcher = self._matchers.get(channel)
+        if matcher is None:
+            keywords = self._channels.get(channel, {})
+            matcher = KeywordMatcher([self._info(keyword) for keyword in keywords])
+            self._matchers[channel] = matcher
+        return matcher
+
+    def match(self, channel, text) -> Dict[int, List[str]]:
+        """Scan a post once and return the matched keywords of every interested user"""
+        if channel not in self._channels:
+            return {}
+
+        subscriptions = self._channels[channel]
+        per_user: Dict[int, List[str]] = {}
+        for keyword in self.matcher_for(channel).find(text):
+            for user_id in subscriptions[keyword]:
+                per_user.setdefault(user_id, []).append(keyword)
+
+        for user_id, keywords in per_user.items():
+            positions = self._user_keywords[user_id]
+            keywords.sort(key=positions.__getitem__)
+        return per_user
+
+
+def benchmark_keyword_index(user_count=1000, keywords_per_user=50, vocabulary_size=400, message_count=200):
+    """Compare matching every user separately with one index scan per post"""
+    from job_filter import find_matched_keywords
+
+    rng = random.Random(5)
+    vocabulary = [f"skill{i}" for i in range(vocabulary_size)] + ["Python", "IT", "C++", "remote work"]
+    channel = "@jobs"
+
+    index = KeywordIndex()
+    per_user = {}
+    for user_id in range(user_count):
+        config = {"channels": [channel], "keywords": rng.sample(vocabulary, keywords_per_user)}
+        index.set_user(user_id, config)
+        per_user[user_id] = normalize_keywords(config["keywords"])
+
+    texts = [" ".join(rng.choice(vocabulary + ["team", "salary", "apply"] * 100) for _ in range(120))
+             for _ in range(message_count)]
+
+    start = time.perf_counter()
+    index.matcher_for(channel)
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    expected = []
+    for text in texts:
+        matches = {}
+        for user_id, keywords in per_user.items():
+            matched = find_matched_keywords(text, keywords)
+            if matched:
+                matches[user_id] = matched
+        expected.append(matches)
+    loop_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actual = [index.match(channel, text) for text in texts]
+    index_time = time.perf_counter() - start
+
+    assert actual == expected
+    print(f"⏱️ {message_count} posts × {user_count} users × {keywords_per_user} keywords: "
+          f"per user {loop_time:.2f}s, index {index_time:.2f}s (+{build_time:.2f}s build, "
+          f"{loop_time / index_time:.0f}× faster)")
+
+
+def test_incremental_updates():
+    index = KeywordIndex()
+    index.set_user(1, {"channels": ["@a", "@b"], "keywords": ["Python", "IT"]})
+    index.set_user(2, {"channels": ["@a"], "keywords": ["remote work", "python"]})
+
+    assert index.match("@a", "Remote work for IT python people") == {1: ["Python", "IT"], 2: ["remote work", "python"]}
+    assert index.match("@b", "Python") == {1: ["Python"]}
+
+    index.set_user(1, {"channels": ["@b"], "keywords": ["Go"]})
+    assert index.match("@a", "IT and python") == {2: ["python"]}
+    assert index.match("@b", "Python and Go") == {1: ["Go"]}
+
+    index.remove_user(2)
+    assert index.match("@a", "python") == {} and index.channels == ["@b"]
+    print("✅ Keyword index updates incrementally")
+
+
+if __name__ == "__main__":
+    test_incremental_updates()
+    benchmark_keyword_index()
@@ -0,0 +1,192 @@
+import asyncio
+from typing import Dict, List
+
+from telethon import events
+from telethon.utils import get_peer_id
+
+from job_filter import build_result
+
+
+class LivePusher:
+    """Push matches to users as soon as new posts arrive.
+
+    A NewMessage handler on the user client listens to the union of the
+    channels followed by users who turned live mode on. The channels are
+    resolved through the EntityCache and registered by peer id, so
+    registering makes no username lookups and posts are mapped back to the
+    configured channels by chat id. Each post is matched once through the
+    shared KeywordIndex, and matches are held per user for digest_interval
+    seconds so a burst of posts becomes one digest message. on_post, when
+    given, is called with the channel and id of every post.
+    """
+
+    def __init__(self, user_client, bot_client, keyword_index, entities, limiter=None, digest_interval=30,
+                 max_items=10, on_post=None):
+        self.user_client = user_client
+        self.on_post = on_post
+        self.bot_client = bot_client
+        self.keyword_index = keyword_index
+        self.entities = entities
+        self.limiter = limiter
+        self.digest_interval = digest_interval
+        self.max_items = max_items
+
+        self.live_users = set()
+        self.pending: Dict[int, List[Dict]] = {}
+        self._flush_tasks: Dict[int, asyncio.Task] = {}
+        self._channels: Dict[int, List[str]] = {}  # Peer id -> configured spellings of the channel
+        self._event = None
+        self._refresh_lock = asyncio.Lock()
+
+    async def enable(self, user_id):
+        self.live_users.add(user_id)
+        await self.refresh_channels()
+
+    async def disable(self, user_id):
+        self.live_users.discard(user_id)
+        self.pending.pop(user_id, None)
+        await self.refresh_channels()
+
+    async def refresh_channels(self):
+        """Re-register the handler for the channels live users follow.
+
+        Channels that cannot be resolved are logged and left out.
+        """
+        async with self._refresh_lock:
+            channels: Dict[int, List[str]] = {}
+            for channel in dict.fromkeys(channel for user_id in self.live_users
+                                         for channel in self.keyword_index.user_channels(user_id)):
+                try:
+                    peer = await self.entities.resolve(self.user_client, channel, self.limiter)
+                    peer_id = get_peer_id(peer)
+                except Exception as e:
+                    print(f"⚠️ Live mode cannot follow {channel}: {e}")
+                    continue
+                channels.setdefault(peer_id, []).append(channel)
+
+            if channels == self._channels:
+                return
+
+            if self._event is not None:
+                self.user_client.remove_event_handler(self.on_new_message, self._event)
+                self._event = None
+
+            self._channels = channels
+            if channels:
+                # An empty chats list would mean every chat, so only register with channels
+                self._event = events.NewMessage(chats=sorted(channels))
+                self.user_client.add_event_handler(self.on_new_message, self._event)
+            print(f"📡 Live mode listening to {len(channels)} channels for {len(self.live_users)} users")
+
+    async def on_new_message(self, event):
+        msg = event.message
+        if not msg.message:
+            return
+
+        for channel in self._channels.get(event.chat_id, []):
+            if self.on_post is not None:
+                self.on_post(channel, msg.id)
+            for user_id, keywords in self.keyword_index.match(channel, msg.message).items():
+                if user_id in self.live_users:
+                    self.queue(user_id, build_result(channel, msg.id, msg.message, str(msg.date), keywords))
+
+    def queue(self, user_id, result):
+        self.pending.setdefault(user_id, []).append(result)
+        if user_id not in self._flush_tasks:
+            self._flush_tasks[user_id] = asyncio.create_task(self._flush_later(user_id))
+
+    async def _flush_later(self, user_id):
+        try:
+            await asyncio.sleep(self.digest_interval)
+        finally:
+            self._flush_tasks.pop(user_id, None)
+        await self._send_digest(user_id)
+
+    async def _send_digest(self, user_id):
+        items = self.pending.pop(user_id, [])
+        if not items:
+            return
+        try:
+            await self.bot_client.send_message(user_id, self.format_digest(items), link_preview=False)
+        except Exception as e:
+            print(f"❌ Failed to push {len(items)} live matches to {user_id}: {e}")
+
+    def format_digest(self, items):
+        digest = f"🔔 **{len(items)} new job{'s' if len(items) != 1 else ''}**\n\n"
+        for item in items[:self.max_items]:
+            preview = " ".join(item["text"].split())[:120]
+            digest += f"• {item['channel']} ({', '.join(item['matched_keywords'])}): {preview}\n{item['url']}\n\n"
+        if len(items) > self.max_items:
+            digest += f"… and {len(items) - self.max_items} more. Use `/search` for the full report."
+        return digest
+
+    async def close(self):
+        """Send pending digests right away, e.g. on shutdown"""
+        tasks = list(self._flush_tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for user_id in list(self.pending):
+            await self._send_digest(user_id)
+
+
+async def test_digest_coalescing():
+    from datetime import datetime, timezone
+    from entity_cache import EntityCache
+    from fake_client import FakeMessage, FakeTelegramClient
+    from keyword_index import KeywordIndex
+
+    class FakeBot:
+        def __init__(self):
+            self.sent = []
+
+        async def send_message(self, chat, text, **kwargs):
+            self.sent.append((chat, text))
+
+    class FakeUserClient(FakeTelegramClient):
+        def __init__(self, channels):
+            super().__init__(channels)
+            self.chats = None
+
+        def add_event_handler(self, callback, event):
+            self.chats = event.chats
+
+        def remove_event_handler(self, callback, event):
+            self.chats = None
+
+    class FakeEvent:
+        def __init__(self, chat_id, msg):
+            self.chat_id = chat_id
+            self.message = msg
+
+    index = KeywordIndex()
+    index.set_user(1, {"channels": ["@remote_work", "@missing"], "keywords": ["Python"]})
+    index.set_user(2, {"channels": ["@Remote_Work", "@go_jobs"], "keywords": ["Go"]})
+    bot = FakeBot()
+    client = FakeUserClient({"@remote_work": [], "@go_jobs": []})
+    entities = EntityCache(":memory:")
+    pusher = LivePusher(client, bot, index, entities, digest_interval=0.1)
+    await pusher.enable(1)
+    await pusher.enable(2)
+    # Both spellings share one peer, and the unresolvable channel is skipped
+    remote_work = get_peer_id(await entities.resolve(client, "@remote_work"))
+    assert client.chats == sorted([remote_work, get_peer_id(await entities.resolve(client, "@go_jobs"))])
+    assert pusher._channels[remote_work] == ["@remote_work", "@Remote_Work"]
+    await pusher.disable(2)
+    # Resolved peers come from the cache, only the missing channel is looked up on every refresh
+    assert client.chats == [remote_work] and client.resolutions == 5, client.resolutions
+
+    now = datetime.now(timezone.utc)
+    for i in range(5):
+        await pusher.on_new_message(FakeEvent(remote_work, FakeMessage(i + 1, f"Python and Go job {i}", now)))
+    await pusher.on_new_message(FakeEvent(-100999, FakeMessage(6, "Python job elsewhere", now)))
+    await asyncio.sleep(0.2)
+
+    assert [chat for chat, _ in bot.sent] == [1], bot.sent
+    assert "5 new jobs" in bot.sent[0][1]
+    entities.close()
+    print("✅ Live matches are coalesced into one digest")
+
+
+if __name__ == "__main__":
+    asyncio.run(test_digest_coalescing())
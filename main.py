@@ -1,23 +1,72 @@
+import time
+
+_IMPORT_START = time.perf_counter()
+
 import asyncio
+import io
 import os
 import re
+from contextlib import contextmanager
 from datetime import datetime
-from io import BytesIO
-from typing import Dict, List
+from typing import Dict
 
 from dotenv import load_dotenv
 from telethon import TelegramClient, events, Button
 from telethon.errors import SessionPasswordNeededError
 
 # Import your existing modules here (implement or adjust as needed)
+from aggregate import MatchAggregate
+from entity_cache import EntityCache
+from fetch_state import FetchState
+from job_archive import JobArchive, format_search_results
 from job_filter import fetch_and_filter_messages
-from report_generator import generate_html_report
-from stats_tracker import JobStats
+from keyword_index import KeywordIndex
+from live_mode import LivePusher
+from message_cache import MessageCache
+from rate_limiter import TokenBucket
+from report_delivery import package_report, upload_parts
+from report_generator import build_report
+from result_cache import CachedSearch, ResultCache
+from search_scheduler import SearchScheduler
+from stats_writer import StatsWriter
+from upload_cache import upload_cache
+from user_config_store import UserConfigStore, warm_matchers
 
 load_dotenv()
 
+IMPORT_SECONDS = time.perf_counter() - _IMPORT_START
+
+
+class StartupTimer:
+    """Seconds spent in each startup phase, printed once the bot is up.
+
+    The two clients start side by side, so their phases overlap and add up
+    to more than the total.
+    """
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {"imports": IMPORT_SECONDS}
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - start
+
+    def report(self):
+        phases = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in self.phases.items())
+        return f"⏱️ Startup: {phases}; ready {time.perf_counter() - _IMPORT_START:.2f}s after launch"
+
+
 class JobFilterBot:
     def __init__(self):
+        self.startup = StartupTimer()
+        with self.startup.phase("init"):
+            self._init()
+
+    def _init(self):
         self.api_id = int(os.getenv("API_ID"))
         self.api_hash = os.getenv("API_HASH")
         self.bot_token = os.getenv("BOT_TOKEN")
@@ -29,39 +78,102 @@ class JobFilterBot:
             self.user_session_file, self.api_id, self.api_hash
         )
 
+        # Every search goes through the same account, so they share one limiter
+        self.rate_limiter = TokenBucket()
+
+        # ...and only a few run at once, with users served in turn
+        self.search_scheduler = SearchScheduler(workers=int(os.getenv("SEARCH_WORKERS", 2)))
+
+        # Finished searches and their reports, reused until a channel has new posts
+        self.result_cache = ResultCache(ttl=int(os.getenv("RESULT_CACHE_SECONDS", 300)))
+
+        # Newest post seen per user and channel, so repeat searches only fetch new posts
+        self.fetch_state = FetchState("bot_fetch_state.db")
+
+        # Posts downloaded for one user are reused by everyone following the same channel
+        self.message_cache = MessageCache("message_cache.db")
+
+        # Channel usernames resolved once for the user account instead of on every search
+        self.entity_cache = EntityCache("channel_entities.db")
+
+        # Every match is archived so /history can answer without touching Telegram
+        self.job_archive = JobArchive("job_archive.db")
+
         # Bot client to interact with users
         self.bot_client = TelegramClient("bot_session", self.api_id, self.api_hash)
 
-        # Per user configs and stats
-        self.user_configs: Dict[int, Dict] = {}
-        self.user_stats: Dict[int, JobStats] = {}
+        # Every user's keywords by channel, so one scan of a post serves all users
+        self.keyword_index = KeywordIndex()
+
+        # Per user configs, kept across restarts
+        self.config_store = UserConfigStore("user_configs.db")
+        self.user_configs: Dict[int, Dict] = self.config_store.load_all()
+        for user_id, config in self.user_configs.items():
+            self.keyword_index.set_user(user_id, config)
+        warm_matchers(self.user_configs.values())
+
+        # Opt-in live mode: new posts are matched on arrival and pushed as digests
+        self.live_pusher = LivePusher(
+            self.user_client, self.bot_client, self.keyword_index, self.entity_cache, self.rate_limiter,
+            digest_interval=int(os.getenv("LIVE_DIGEST_SECONDS", 30)),
+            on_post=self.result_cache.channel_updated,  # A new post makes cached results incomplete
+        )
+
+        # Every user's stats in one database, written in batches off the event loop
+        self.stats_writer = StatsWriter("user_stats.db", interval=float(os.getenv("STATS_FLUSH_SECONDS", 5)))
 
-    async def start(self):
-        # Start user client first (login if needed)
-        await self.user_client.start()
-        if not await self.user_client.is_user_authorized():
-            print("User client not authorized. Please complete login.")
-            await self.user_client.send_code_request(input("Enter phone number: "))
-            try:
-                await self.user_client.sign_in(
-                    phone=input("Enter phone number: "),
-                    code=input("Enter code you received: "),
-                )
-            except SessionPasswordNeededError:
-                await self.user_client.sign_in(password=input("Two-step password: "))
+    async def _start_user_client(self):
+        # start() connects and runs telethon's own login when needed, so both are timed together
+        with self.startup.phase("user connect+auth"):
+            await self.user_client.start()
+            if not await self.user_client.is_user_authorized():
+                print("User client not authorized. Please complete login.")
+                await self.user_client.send_code_request(input("Enter phone number: "))
+                try:
+                    await self.user_client.sign_in(
+                        phone=input("Enter phone number: "),
+                        code=input("Enter code you received: "),
+                    )
+                except SessionPasswordNeededError:
+                    await self.user_client.sign_in(password=input("Two-step password: "))
 
         print("✅ User client authorized and started.")
 
-        # Start bot client
-        await self.bot_client.start(bot_token=self.bot_token)
-        me = await self.bot_client.get_me()
+    async def _start_bot_client(self):
+        with self.startup.phase("bot connect"):
+            await self.bot_client.connect()
+
+        with self.startup.phase("bot auth"):
+            await self.bot_client.start(bot_token=self.bot_token)
+            me = await self.bot_client.get_me()
         print(f"🤖 Bot started as @{me.username}")
 
+    async def start(self):
+        # Neither client needs the other to connect, so they start together
+        await asyncio.gather(self._start_user_client(), self._start_bot_client())
+
         # Register event handlers on bot client
-        self.register_handlers()
+        with self.startup.phase("handlers"):
+            self.register_handlers()
+            self.stats_writer.start()
+
+        # Users who had live mode on before the restart keep getting pushes
+        with self.startup.phase("live mode"):
+            self.live_pusher.live_users.update(self.config_store.live_users() & self.user_configs.keys())
+            if self.live_pusher.live_users:
+                await self.live_pusher.refresh_channels()
 
+        print(self.startup.report())
         print("🚀 Bot is running! Users can start chatting with it.")
-        await self.bot_client.run_until_disconnected()
+        try:
+            await self.bot_client.run_until_disconnected()
+        finally:
+            await self.live_pusher.close()
+            await self.stats_writer.close()
+            self.config_store.close()
+            self.entity_cache.close()
+            self.fetch_state.close()
+            self.message_cache.close()
 
     def register_handlers(self):
         @self.bot_client.on(events.NewMessage(pattern="/start"))
@@ -88,6 +200,14 @@ class JobFilterBot:
         async def status_handler(event):
             await self.handle_status(event)
 
+        @self.bot_client.on(events.NewMessage(pattern="/history"))
+        async def history_handler(event):
+            await self.handle_history(event)
+
+        @self.bot_client.on(events.NewMessage(pattern="/live"))
+        async def live_handler(event):
+            await self.handle_live(event)
+
         @self.bot_client.on(events.NewMessage())
         async def config_message_handler(event):
             if re.search(r"^(CHANNELS|channels):", event.message.message, re.MULTILINE):
@@ -113,9 +233,12 @@ class JobFilterBot:
 
 **📋 Commands:**
 • `/config` - Set up channels and keywords
-• `/search` - Find jobs matching your criteria
+• `/search` - Find new jobs matching your criteria
+• `/search full` - Search older posts again too
 • `/stats` - View your search statistics
 • `/status` - Check your current settings
+• `/live` - Get new matching posts pushed as they appear
+• `/history golang remote last 30 days` - Search jobs found earlier
 • `/help` - Show this help message
 
 **💡 Features:**
@@ -178,9 +301,9 @@ Or use quick setup buttons below:
 
         try:
             config = self.parse_user_config(text)
-            self.user_configs[user_id] = config
+            await self.set_user_config(user_id, config)
 
-            # Save config (optional)
+            # Keep it across restarts
             await self.save_user_config(user_id, config)
 
             summary = f"""
@@ -203,11 +326,21 @@ Ready to search? Use `/search` or the button below!
             buttons = [[Button.inline("🔍 Search Now", b"search_jobs")]]
             await event.respond(summary, buttons=buttons)
 
+            # Resolve new channels now so the first search skips it
+            await self.entity_cache.warm(self.user_client, config["channels"], self.rate_limiter)
+
         except Exception as e:
             await event.respond(
                 f"❌ **Config Error:** {str(e)}\n\nPlease check the format and try again."
             )
 
+    async def set_user_config(self, user_id: int, config: Dict):
+        self.user_configs[user_id] = config
+        self.keyword_index.set_user(user_id, config)
+        self.fetch_state.reset(user_id)  # New keywords need a full rescan
+        if user_id in self.live_pusher.live_users:
+            await self.live_pusher.refresh_channels()
+
     def parse_user_config(self, text: str) -> Dict:
         lines = [line.strip() for line in text.split("\n") if line.strip()]
 
@@ -238,6 +371,8 @@ Ready to search? Use `/search` or the button below!
                 elif current_section == "keywords":
                     config["keywords"].append(line.strip())
 
+        # `python_jobs` and `@python_jobs` are the same channel
+        config["channels"] = list(dict.fromkeys(config["channels"]))
         if not config["channels"]:
             raise ValueError("No channels specified")
         if not config["keywords"]:
@@ -255,44 +390,63 @@ Ready to search? Use `/search` or the button below!
             )
             return
 
-        search_msg = await event.respond(
-            "🔍 **Searching for jobs...**\n\nPlease wait, this may take a moment..."
-        )
-
-        try:
-            config = self.user_configs[user_id]
+        config = self.user_configs[user_id]
+        if getattr(event, "raw_text", "").strip().lower().endswith("full"):
+            # `/search full` ignores the saved high-water marks
+            config = {**config, "full_rescan": True}
+
+        key = self.search_key(user_id, config)
+        result = self.result_cache.get(key)
+        search = None
+        if result is None:
+            search = self.search_scheduler.submit(user_id, key, lambda: self.run_search(user_id, config, key))
+            if search is None:
+                await event.respond(
+                    "⏳ **Your search is already on its way.**\n\nThe results will be sent here as soon as it finishes."
+                )
+                return
 
-            # Use user client to fetch and filter messages (hybrid approach)
-            filtered = await fetch_and_filter_messages(self.user_client, config)
+        position = search.position if search is not None else 0
+        search_msg = await event.respond(self.search_status(position))
 
-            if not filtered:
+        try:
+            if search is not None:
+                async for new_position in search.positions():
+                    if new_position != position:
+                        position = new_position
+                        await search_msg.edit(self.search_status(position))
+                if position:
+                    await search_msg.edit(self.search_status(0))
+                result = await search
+            print(self.result_cache.format_stats())
+
+            # The marks only move on once the user has the results, so a failed delivery
+            # finds the same posts (or this cached result) next time. Results from another
+            # user's run (coalesced or cached) started from this user's marks too.
+            aggregate = result.aggregate
+            if not aggregate.job_count:
+                self.fetch_state.commit(user_id, result.newest_ids)
                 await search_msg.edit(
-                    "❌ **No jobs found** matching your criteria.\n\nTry adjusting your keywords or checking different channels.",
+                    "❌ **No new jobs found** matching your criteria.\n\nTry adjusting your keywords, checking different channels, or `/search full` to rescan older posts.",
                     buttons=[[Button.inline("⚙️ Update Config", b"setup_config")]],
                 )
                 return
 
-            # Update stats
-            if user_id not in self.user_stats:
-                self.user_stats[user_id] = JobStats(f"user_{user_id}_stats.json")
-            self.user_stats[user_id].update_stats(filtered)
-
-            # Generate HTML report
-            html_content = generate_html_report(filtered)
-            html_file = BytesIO(html_content.encode("utf-8"))
-            filename = f"jobs_{user_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.html"
+            # Update stats; written in the background, never on the event loop
+            self.stats_writer.record(user_id, aggregate)
 
-            await self.bot_client.send_file(
+            await upload_parts(
+                self.bot_client,
                 event.chat_id,
-                html_file,
-                caption=f"📄 **Job Report Generated!**\n\n🎯 Found **{len(filtered)}** matching jobs\n💡 Open the HTML file in your browser for best experience",
-                file_name=filename,
-                force_document=True,
+                [(filename, io.BytesIO(data)) for filename, data in result.parts],
+                f"📄 **Job Report Generated!**\n\n🎯 Found **{aggregate.job_count}** matching jobs\n💡 Open the HTML file in your browser for best experience",
             )
+            print(upload_cache.format_stats())
 
             # Send summary
-            summary = self.generate_search_summary(filtered)
+            summary = self.generate_search_summary(aggregate)
             await self.bot_client.send_message(event.chat_id, summary)
+            self.fetch_state.commit(user_id, result.newest_ids)
 
             await search_msg.delete()
 
@@ -301,30 +455,57 @@ Ready to search? Use `/search` or the button below!
                 f"❌ **Search Error:** {str(e)}\n\nPlease try again or contact support."
             )
 
-    def generate_search_summary(self, messages: List[Dict]) -> str:
-        if not messages:
+    def search_key(self, user_id: int, config: Dict) -> str:
+        """Searches with equal keys return the same matches, so they can share one run and its report"""
+        marks = [0 if config.get("full_rescan") else self.fetch_state.get_min_id(user_id, channel)
+                 for channel in config["channels"]]
+        return ResultCache.key(config["channels"], config["keywords"], config.get("message_limit", 50), marks)
+
+    async def run_search(self, user_id: int, config: Dict, key: str) -> CachedSearch:
+        # Use user client to fetch and filter messages (hybrid approach)
+        # Counted once while the matches stream in, then shared by the report, summary and stats
+        aggregate = MatchAggregate(config["channels"])
+        fetched = {}
+        filtered = await fetch_and_filter_messages(
+            self.user_client, config, self.rate_limiter, self.fetch_state, user_id, self.message_cache,
+            archive=self.job_archive, aggregate=aggregate, entities=self.entity_cache, newest_ids=fetched,
+        )
+        print(self.entity_cache.format_stats())
+
+        # Generate HTML report, rendered once for everyone who gets this result
+        parts = []
+        if filtered:
+            filename = f"jobs_{datetime.now().strftime('%Y%m%d_%H%M%S')}.html"
+            report = build_report(filtered, config["channels"], aggregate)
+            parts = [(name, buffer.getvalue()) for name, buffer in package_report(report, filename, config)]
+
+        # Where the marks stand once this result is delivered
+        newest_ids = {channel: max(fetched.get(channel) or 0, self.fetch_state.get_min_id(user_id, channel))
+                      for channel in config["channels"]}
+        for channel, newest_id in newest_ids.items():
+            self.result_cache.channel_updated(channel, newest_id)
+        return self.result_cache.put(key, aggregate, parts, newest_ids)
+
+    @staticmethod
+    def search_status(position: int) -> str:
+        if position:
+            return (f"⏳ **Waiting for a free search slot...**\n\nYou are **#{position}** in the queue, "
+                    f"your search starts automatically.")
+        return "🔍 **Searching for jobs...**\n\nPlease wait, this may take a moment..."
+
+    def generate_search_summary(self, aggregate: MatchAggregate) -> str:
+        if not aggregate.job_count:
             return "❌ No jobs found"
 
-        channels = {}
-        total_with_contact = 0
-        all_keywords = []
-
-        for msg in messages:
-            channel = msg["channel"]
-            channels[channel] = channels.get(channel, 0) + 1
-            if msg.get("has_contact"):
-                total_with_contact += 1
-            all_keywords.extend(msg.get("matched_keywords", []))
-
-        from collections import Counter
-
-        top_keywords = Counter(all_keywords).most_common(3)
+        channels = aggregate.channel_counts
+        total_with_contact = aggregate.with_contact
+        top_keywords = aggregate.keyword_counts.most_common(3)
 
         summary = f"""🎯 **Search Results Summary**
 
 📊 **Overview:**
-• **{len(messages)}** jobs found
-• **{total_with_contact}** with contact info ({total_with_contact / len(messages) * 100:.1f}%)
+• **{aggregate.job_count}** jobs found
+• **{total_with_contact}** with contact info ({aggregate.contact_share * 100:.1f}%)
 • **{len(channels)}** channels searched
 
 📈 **Top Channels:**
@@ -358,36 +539,38 @@ Ready to search? Use `/search` or the button below!
                 "keywords": ["Python", "JavaScript", "React", "Node.js", "IT", "backend", "frontend"],
                 "message_limit": 50,
             }
-            self.user_configs[user_id] = tech_config
+            await self.set_user_config(user_id, tech_config)
+            await self.save_user_config(user_id, tech_config)
             await event.respond(
                 "✅ **Tech Jobs Config Applied!**\n\nYou can now search or customize further with `/config`"
             )
+            await self.entity_cache.warm(self.user_client, tech_config["channels"], self.rate_limiter)
         elif data == "remote_config":
             remote_config = {
                 "channels": ["@remote_work", "@remotejobs", "@freelance_jobs"],
                 "keywords": ["remote", "work from home", "freelance", "online", "digital nomad"],
                 "message_limit": 50,
             }
-            self.user_configs[user_id] = remote_config
+            await self.set_user_config(user_id, remote_config)
+            await self.save_user_config(user_id, remote_config)
             await event.respond(
                 "✅ **Remote Work Config Applied!**\n\nYou can now search or customize further with `/config`"
             )
+            await self.entity_cache.warm(self.user_client, remote_config["channels"], self.rate_limiter)
         elif data == "show_config":
             await self.show_current_config(event)
 
     async def handle_stats(self, event):
         user_id = event.sender_id
 
-        if user_id not in self.user_stats:
+        summary = await self.stats_writer.summary(user_id)
+        if summary is None:
             await event.respond(
                 "📊 **No statistics yet!**\n\nStart searching for jobs to see your stats.",
                 buttons=[[Button.inline("🔍 Search Jobs", b"search_jobs")]],
             )
             return
 
-        stats = self.user_stats[user_id]
-        summary = stats.get_summary()
-
         buttons = [
             [Button.inline("🔍 Search Again", b"search_jobs")],
             [Button.inline("⚙️ Update Config", b"setup_config")],
@@ -395,6 +578,45 @@ Ready to search? Use `/search` or the button below!
 
         await event.respond(f"📊 **Your Statistics**\n\n{summary}", buttons=buttons)
 
+    async def handle_history(self, event):
+        user_id = event.sender_id
+        query = event.raw_text.partition(" ")[2].strip()
+
+        if not query:
+            await event.respond(
+                "🗄️ **Search your job history**\n\n"
+                "Examples:\n• `/history golang remote last 30 days`\n"
+                "• `/history python @python_jobs with contact`\n• `/history today`"
+            )
+            return
+
+        # Without an explicit @channel, stay within the user's own channels
+        channels = self.user_configs.get(user_id, {}).get("channels")
+        results = self.job_archive.search(query, limit=50, channels=channels)
+        await event.respond(format_search_results(results), link_preview=False)
+
+    async def handle_live(self, event):
+        user_id = event.sender_id
+
+        if user_id not in self.user_configs:
+            await event.respond(
+                "❌ **No configuration found!**\n\nPlease set up your channels and keywords first.",
+                buttons=[[Button.inline("⚙️ Setup Config", b"setup_config")]],
+            )
+            return
+
+        if user_id in self.live_pusher.live_users:
+            await self.live_pusher.disable(user_id)
+            self.config_store.set_live(user_id, False)
+            await event.respond("🔕 **Live mode off.** Use `/search` to look for jobs on demand.")
+        else:
+            await self.live_pusher.enable(user_id)
+            self.config_store.set_live(user_id, True)
+            await event.respond(
+                f"🔔 **Live mode on!**\n\nNew matching posts will be sent here in digests "
+                f"every {self.live_pusher.digest_interval}s. Send `/live` again to turn it off."
+            )
+
     async def handle_status(self, event):
         user_id = event.sender_id
         await self.show_current_config(event)
@@ -432,8 +654,8 @@ Ready to search? Use `/search` or the button below!
         await event.respond(config_text, buttons=buttons)
 
     async def save_user_config(self, user_id: int, config: Dict):
-        # Optional: save user config to file or DB
-        pass
+        # One small row, so the write is quick enough to do inline
+        self.config_store.save(user_id, config)
 
 
 async def main():
@@ -0,0 +1,211 @@
+import asyncio
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+
+class CachedMessage:
+    __slots__ = ("id", "message", "date")
+
+    def __init__(self, id, message, date):
+        self.id = id
+        self.message = message
+        self.date = date
+
+
+class MessageCache:
+    """SQLite store of channel posts shared by every search.
+
+    For each channel it remembers the newest id fetched, when that was, and
+    covered_from: every post with an id between covered_from and newest_id is
+    in the store. Searches read from the store and only fetch posts newer
+    than newest_id once the sync is older than ttl, or older posts when the
+    covered range holds fewer than the requested limit. One lock per channel
+    makes concurrent searches wait for a single in-flight fetch. A channel
+    keeps max_messages_per_channel posts, or as many as the largest limit a
+    search has asked of it, so big searches are not downloaded every time.
+    The SQLite work runs on a single worker thread that owns the
+    connection, so storing and trimming posts never stalls the event loop.
+    """
+
+    def __init__(self, db_path="message_cache.db", ttl=300, max_messages_per_channel=1000):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_messages_per_channel = max_messages_per_channel
+        self.network_fetches = 0
+        self._locks = {}
+        self._largest_limits = {}
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="message-cache")
+
+        # Only ever used on the worker thread, one call at a time
+        self.db = sqlite3.connect(db_path, check_same_thread=False)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS messages (
+                channel TEXT NOT NULL,
+                id INTEGER NOT NULL,
+                text TEXT,
+                date TEXT,
+                PRIMARY KEY (channel, id)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS channel_sync (
+                channel TEXT PRIMARY KEY,
+                newest_id INTEGER NOT NULL,
+                covered_from INTEGER NOT NULL,
+                fetched_at REAL NOT NULL
+            );
+        """)
+
+    def close(self):
+        self._executor.submit(self.db.close).result()
+        self._executor.shutdown()
+
+    async def _in_thread(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+
+    def _get_sync(self, channel):
+        return self.db.execute(
+            "SELECT newest_id, covered_from, fetched_at FROM channel_sync WHERE channel = ?", (channel,)
+        ).fetchone()
+
+    def _set_sync(self, channel, newest_id, covered_from, fetched_at):
+        self.db.execute(
+            "INSERT OR REPLACE INTO channel_sync (channel, newest_id, covered_from, fetched_at) VALUES (?, ?, ?, ?)",
+            (channel, newest_id, covered_from, fetched_at)
+        )
+
+    def _store(self, channel, messages):
+        self.db.executemany(
+            "INSERT OR REPLACE INTO messages (channel, id, text, date) VALUES (?, ?, ?, ?)",
+            [(channel, msg.id, msg.message, msg.date.isoformat() if msg.date else None) for msg in messages]
+        )
+
+    def _count_covered(self, channel, covered_from, min_id):
+        return self.db.execute(
+            "SELECT COUNT(*) FROM messages WHERE channel = ? AND id >= ? AND id > ?",
+            (channel, covered_from, min_id)
+        ).fetchone()[0]
+
+    async def _download(self, client, limiter, channel, **kwargs):
+        if limiter is not None:
+            await limiter.acquire()
+        self.network_fetches += 1
+        return [msg async for msg in client.iter_messages(channel, **kwargs)]
+
+    async def refresh(self, client, channel, limit, min_id=0, limiter=None, peer=None):
+        """Make sure the newest `limit` posts above min_id are cached and fresh.
+
+        Posts are stored under channel and fetched from peer when one is given.
+        """
+        peer = peer or channel
+        self._largest_limits[channel] = max(limit, self._largest_limits.get(channel, 0))
+        lock = self._locks.setdefault(channel, asyncio.Lock())
+        async with lock:
+            sync = await self._in_thread(self._get_sync, channel)
+            now = time.time()
+
+            if sync is None:
+                fetched = await self._download(client, limiter, peer, limit=limit, min_id=min_id)
+                newest_id = max((msg.id for msg in fetched), default=min_id)
+                if len(fetched) < limit:
+                    covered_from = min_id + 1  # reached min_id or the start of the channel
+                else:
+                    covered_from = min(msg.id for msg in fetched)
+                await self._in_thread(self._store, channel, fetched)
+                sync = (newest_id, covered_from, now)
+
+            elif now - sync[2] > self.ttl:
+                newest_id, covered_from, _ = sync
+                fetched = await self._download(client, limiter, peer, limit=limit, min_id=newest_id)
+                if len(fetched) >= limit:
+                    # There may be a gap between the old and new posts
+                    covered_from = min(msg.id for msg in fetched)
+                newest_id = max([newest_id] + [msg.id for msg in fetched])
+                await self._in_thread(self._store, channel, fetched)
+                sync = (newest_id, covered_from, now)
+
+            newest_id, covered_from, fetched_at = sync
+            if covered_from > min_id + 1:
+                cached = await self._in_thread(self._count_covered, channel, covered_from, min_id)
+                if cached < limit:
+                    fetched = await self._download(client, limiter, peer, limit=limit - cached,
+                                                   offset_id=covered_from, min_id=min_id)
+                    if len(fetched) < limit - cached:
+                        covered_from = min_id + 1
+                    else:
+                        covered_from = min(msg.id for msg in fetched)
+                    await self._in_thread(self._store, channel, fetched)
+
+            await self._in_thread(self._save_sync, channel, newest_id, covered_from, fetched_at)
+
+    def _save_sync(self, channel, newest_id, covered_from, fetched_at):
+        covered_from = self._trim(channel, covered_from)
+        self._set_sync(channel, newest_id, covered_from, fetched_at)
+        self.db.commit()
+
+    def _trim(self, channel, covered_from):
+        """Drop the oldest posts beyond max_messages_per_channel or the largest limit searched"""
+        keep = max(self.max_messages_per_channel, self._largest_limits.get(channel, 0))
+        row = self.db.execute(
+            "SELECT id FROM messages WHERE channel = ? ORDER BY id DESC LIMIT 1 OFFSET ?",
+            (channel, keep - 1)
+        ).fetchone()
+        if row is None:
+            return covered_from
+
+        self.db.execute("DELETE FROM messages WHERE channel = ? AND id < ?", (channel, row[0]))
+        return max(covered_from, row[0])
+
+    def _read(self, channel, min_id, upper, limit):
+        return self.db.execute(
+            "SELECT id, text, date FROM messages WHERE channel = ? AND id > ? AND id < ? ORDER BY id DESC LIMIT ?",
+            (channel, min_id, upper, limit)
+        ).fetchall()
+
+    async def iter_messages(self, client, channel, limit, offset_id=0, min_id=0, limiter=None, peer=None):
+        """Drop-in for client.iter_messages that reads through the cache"""
+        await self.refresh(client, channel, limit, min_id, limiter, peer)
+
+        upper = offset_id if offset_id else 2 ** 63 - 1
+        rows = await self._in_thread(self._read, channel, min_id, upper, limit)
+
+        for msg_id, text, date in rows:
+            yield CachedMessage(msg_id, text, datetime.fromisoformat(date) if date else None)
+
+
+async def test_shared_cache():
+    """Many searches of one channel trigger a single download"""
+    from fake_client import FakeTelegramClient
+    from job_filter import fetch_and_filter_messages
+
+    client = FakeTelegramClient({"@remote_work": [f"Remote Python job {i}" for i in range(30)]}, latency=0.1)
+    cache = MessageCache(":memory:", ttl=60)
+    config = {"channels": ["@remote_work"], "keywords": ["Python"], "message_limit": 20, "deduplicate": False}
+
+    results = await asyncio.gather(*(fetch_and_filter_messages(client, config, cache=cache) for _ in range(50)))
+    assert all(len(r) == 20 for r in results)
+    assert client.requests == 1, client.requests
+
+    # A larger limit only downloads the missing older posts
+    bigger = await fetch_and_filter_messages(client, {**config, "message_limit": 30}, cache=cache)
+    assert len(bigger) == 30 and client.requests == 2, client.requests
+
+    # Stale syncs only download posts newer than the cache
+    client.post("@remote_work", "New Python job")
+    cache.ttl = 0
+    fresh = await fetch_and_filter_messages(client, config, cache=cache)
+    assert fresh[0]["text"] == "New Python job" and client.requests == 3, client.requests
+
+    # Limits above max_messages_per_channel are kept whole instead of downloaded again every search
+    cache = MessageCache(":memory:", ttl=60, max_messages_per_channel=10)
+    requests = client.requests
+    for _ in range(3):
+        assert len(await fetch_and_filter_messages(client, config, cache=cache)) == 20
+    assert client.requests == requests + 1, client.requests
+
+    cache.close()
+    print(f"✅ 55 searches made {client.requests} downloads")
+
+
+if __name__ == "__main__":
+    asyncio.run(test_shared_cache())
@@ -0,0 +1,27 @@
+import inspect
+
+
+async def run_pipeline(stream, consumers):
+    """Feed every match from an async stream to each consumer as it arrives.
+
+    Consumers have add(item) and optionally close(); either may be a
+    coroutine. The next match is only pulled once every consumer has taken
+    the current one, which is what holds back fetching when they are slow.
+    Returns the number of matches.
+    """
+    count = 0
+    try:
+        async for item in stream:
+            count += 1
+            for consumer in consumers:
+                result = consumer.add(item)
+                if inspect.isawaitable(result):
+                    await result
+    finally:
+        for consumer in consumers:
+            close = getattr(consumer, "close", None)
+            if close is not None:
+                result = close()
+                if inspect.isawaitable(result):
+                    await result
+    return count
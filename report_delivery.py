@@ -0,0 +1,199 @@
+import gzip
+import io
+import json
+import random
+import time
+import zipfile
+from html import escape
+from typing import List, Tuple
+
+from report_generator import HtmlReportBuilder, REPORT_TAIL, build_report
+from upload_cache import upload_cache
+
+FORMATS = ("auto", "html", "gzip", "zip", "json", "pages", "channels")
+
+DEFAULTS = {
+    "report_format": "auto",  # auto switches format past the limits below
+    "report_max_bytes": 2 * 1024 * 1024,  # Largest plain HTML report sent as is
+    "report_large_format": "json",  # Used by auto past report_max_bytes: json, zip, gzip, pages or channels
+    "report_max_upload_bytes": 20 * 1024 * 1024,  # Past this auto splits into pages
+    "report_page_jobs": 1000,  # Jobs per part when splitting into pages
+}
+
+# Small page that renders the cards from a compact JSON payload, with the same markup as the HTML report
+JSON_SHELL = """<div id="sections"></div>
+    <script>
+    const report = {payload};
+    const card = j => `
+                <div class="job-card">
+                    <div class="job-header">
+                        <div class="job-meta">
+                            📅 ${{j[0]}} | 📝 ${{j[1]}} words | 📞 Contact: ${{j[2] ? "✅" : "❌"}}
+                            <a href="${{j[3]}}" class="job-link" target="_blank">🔗 View Original</a>${{j[4]}}
+                        </div>
+                    </div>
+                    <div class="job-content">
+                        ${{j[5]}}
+                    </div>
+                </div>`;
+    document.getElementById("sections").innerHTML = report.map(([channel, jobs]) => `
+            <div class="channel-section">
+                <h2 class="channel-title">📢 ${{channel}} (${{jobs.length}} jobs)</h2>
+                <div class="job-cards">${{jobs.map(card).join("")}}</div>
+            </div>`).join("");
+    </script>"""
+
+
+def report_options(config=None):
+    options = dict(DEFAULTS)
+    options.update({key: value for key, value in (config or {}).items() if key in DEFAULTS})
+    if options["report_format"] not in FORMATS:
+        raise ValueError(f"Unknown report_format: {options['report_format']}")
+    return options
+
+
+def html_part(report, filename):
+    return filename, report.upload_file()
+
+
+def gzip_part(report, filename):
+    buffer = io.BytesIO()
+    with gzip.GzipFile(filename=filename, mode="wb", fileobj=buffer, compresslevel=6) as sink:
+        report.write(sink)
+    buffer.seek(0)
+    return f"{filename}.gz", buffer
+
+
+def zip_part(report, filename):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        with archive.open(filename, "w") as sink:
+            report.write(sink)
+    buffer.seek(0)
+    return filename.replace(".html", ".zip"), buffer
+
+
+def json_part(report, filename):
+    """The report header with cards rendered in the browser from a JSON payload"""
+    payload = json.dumps(
+        [[escape(channel), cards] for channel, cards in report.sections.items() if cards],
+        ensure_ascii=False, separators=(",", ":"),
+    ).replace("</", "<\\/")  # Never close the script tag early
+
+    buffer = io.BytesIO()
+    buffer.write(report.head().encode("utf-8"))
+    buffer.write(JSON_SHELL.format(payload=payload).encode("utf-8"))
+    buffer.write(REPORT_TAIL.encode("utf-8"))
+    buffer.seek(0)
+    return filename, buffer
+
+
+def numbered(parts, filename, make_part):
+    stem = filename.rsplit(".", 1)[0]
+    return [make_part(part, f"{stem}_part{i}.html") for i, part in enumerate(parts, 1)]
+
+
+def package_report(report: HtmlReportBuilder, filename, config=None) -> List[Tuple[str, io.BytesIO]]:
+    """Turn a report into the (file name, buffer) parts to upload.
+
+    "auto" sends plain HTML up to report_max_bytes, report_large_format past
+    that, and pages of report_page_jobs jobs if even that is larger than
+    report_max_upload_bytes.
+    """
+    options = report_options(config)
+    fmt = options["report_format"]
+
+    if fmt == "auto":
+        if report.estimated_size() <= options["report_max_bytes"]:
+            return [html_part(report, filename)]
+        parts = package_report(report, filename, {**options, "report_format": options["report_large_format"]})
+        if len(parts) == 1 and parts[0][1].getbuffer().nbytes > options["report_max_upload_bytes"]:
+            parts = package_report(report, filename, {**options, "report_format": "pages"})
+        return parts
+
+    if fmt == "html":
+        return [html_part(report, filename)]
+    if fmt == "gzip":
+        return [gzip_part(report, filename)]
+    if fmt == "zip":
+        return [zip_part(report, filename)]
+    if fmt == "json":
+        return [json_part(report, filename)]
+    if fmt == "channels":
+        return numbered(report.per_channel(), filename, html_part)
+    return numbered(report.pages(options["report_page_jobs"]), filename, html_part)
+
+
+async def upload_parts(client, chat, parts, caption, cache=upload_cache, **kwargs):
+    """Send every part as a document and log its size and upload time.
+
+    The bytes go through the upload cache, so sending the same parts to
+    another chat reuses the earlier upload.
+    """
+    for i, (filename, buffer) in enumerate(parts, 1):
+        part_caption = caption if len(parts) == 1 else f"{caption}\n\n📎 Part {i}/{len(parts)}"
+        data = buffer.getvalue()
+        misses = cache.misses
+        start = time.perf_counter()
+        await cache.send_file(client, chat, data, filename, caption=part_caption, **kwargs)
+        reused = "" if cache.misses > misses else " (reused upload)"
+        print(f"📤 Sent {filename}: {len(data) / 1024:.0f} KiB in {time.perf_counter() - start:.2f}s{reused}")
+
+
+def benchmark_report_delivery(job_count=10_000):
+    """Bytes and packing time of every format for the same report"""
+    from job_match import JobMatch
+
+    rng = random.Random(14)
+    words = ("python senior developer remote team salary apply contact hiring startup office benefits "
+             "experience years backend frontend django docker kubernetes postgres flexible hours").split()
+    words += [f"word{i}" for i in range(2000)]
+    channels = [f"@channel_{i}" for i in range(10)]
+    report = build_report(
+        JobMatch(channels[i % len(channels)], i, " ".join(rng.choice(words) for _ in range(120)) + " Python",
+                 "2025-01-01 00:00:00+00:00", ["Python"], True)
+        for i in range(job_count)
+    )
+    print(f"📏 {job_count} jobs, estimated HTML size {report.estimated_size() / 1024 / 1024:.1f} MiB")
+
+    for fmt in FORMATS[1:]:
+        start = time.perf_counter()
+        parts = package_report(report, "job_report.html", {"report_format": fmt, "report_page_jobs": 2500})
+        elapsed = time.perf_counter() - start
+        size = sum(buffer.getbuffer().nbytes for _, buffer in parts)
+        print(f"⏱️ {fmt}: {len(parts)} file{'s' if len(parts) != 1 else ''}, {size / 1024 / 1024:.2f} MiB "
+              f"in {elapsed * 1000:.0f}ms")
+
+    size = len(report.html().encode("utf-8"))
+    _, zipped = package_report(report, "job_report.html", {"report_format": "zip"})[0]
+    _, gzipped = package_report(report, "job_report.html", {"report_format": "gzip"})[0]
+    assert len(zipfile.ZipFile(zipped).read("job_report.html")) == len(gzip.decompress(gzipped.getvalue())) == size
+
+
+def test_auto_format():
+    from job_match import JobMatch
+
+    report = build_report(JobMatch(f"@c{i % 3}", i, "Python job </script> " * 20, "2025-01-01", ["Python"], False)
+                          for i in range(30))
+    assert [name for name, _ in package_report(report, "r.html")] == ["r.html"]
+
+    small = {"report_max_bytes": 1000, "report_max_upload_bytes": 10 ** 9}
+    (name, buffer), = package_report(report, "r.html", small)
+    assert name == "r.html" and b"const report" in buffer.getvalue()
+    assert b"</script> " not in buffer.getvalue()
+
+    parts = package_report(report, "r.html", {**small, "report_max_upload_bytes": 1000, "report_page_jobs": 12})
+    assert [name for name, _ in parts] == ["r_part1.html", "r_part2.html", "r_part3.html"]
+    assert [part.job_count for part in report.pages(12)] == [12, 12, 6]
+    # Each part's header counts its own jobs
+    assert b"Found 6 jobs from 1 channels" in parts[2][1].getvalue()
+
+    # The JSON shell carries the same header as the HTML
+    _, shell = json_part(report, "r.html")
+    assert shell.getvalue().startswith(report.head().encode("utf-8"))
+    print("✅ Reports switch format past the size limits")
+
+
+if __name__ == "__main__":
+    test_auto_format()
+    benchmark_report_delivery()
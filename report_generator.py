@@ -1,26 +1,23 @@
+import io
 import re
+import time
+import tracemalloc
 from datetime import datetime
+from functools import lru_cache
+from html import escape
 
+from aggregate import MatchAggregate
+from job_filter import merge_spans
 
-def generate_html_report(messages):
-    """Generate a nice HTML report of filtered jobs"""
-    if not messages:
-        return "<html><body><h1>No jobs found</h1></body></html>"
+EMPTY_REPORT = "<html><body><h1>No jobs found</h1></body></html>"
 
-    # Group by channel for better organization
-    channels = {}
-    for msg in messages:
-        channel = msg['channel']
-        if channel not in channels:
-            channels[channel] = []
-        channels[channel].append(msg)
-
-    html = f"""
+# Templates are plain str.format strings built once at import; CSS braces are doubled
+REPORT_HEAD = """
     <!DOCTYPE html>
     <html>
     <head>
         <meta charset="UTF-8">
-        <title>Job Filter Results - {datetime.now().strftime('%Y-%m-%d %H:%M')}</title>
+        <title>Job Filter Results - {title_time}</title>
         <style>
             body {{ font-family: Arial, sans-serif; margin: 20px; background: #f5f5f5; }}
             .container {{ max-width: 1200px; margin: 0 auto; background: white; padding: 20px; border-radius: 8px; box-shadow: 0 2px 4px rgba(0,0,0,0.1); }}
@@ -42,68 +39,292 @@ def generate_html_report(messages):
         <div class="container">
             <div class="header">
                 <h1>🔍 Job Filter Results</h1>
-                <p>Generated on {datetime.now().strftime('%Y-%m-%d at %H:%M:%S')}</p>
+                <p>Generated on {generated}</p>
             </div>
 
             <div class="stats">
                 <strong>📊 Summary:</strong> 
-                Found {len(messages)} jobs from {len(channels)} channels
+                Found {job_count} jobs from {channel_count} channels
             </div>
     """
 
-    for channel, jobs in channels.items():
-        html += f"""
+SECTION_OPEN = """
             <div class="channel-section">
-                <h2 class="channel-title">📢 {channel} ({len(jobs)} jobs)</h2>
+                <h2 class="channel-title">📢 {channel} ({count} jobs)</h2>
                 <div class="job-cards">
         """
 
-        for job in jobs:
-            # Highlight keywords in text
-            text = job['text']
-            for keyword in job.get('matched_keywords', []):
-                text = re.sub(f"({re.escape(keyword)})", r'<span class="keywords">\1</span>', text, flags=re.IGNORECASE)
+SECTION_CLOSE = """
+                </div>
+            </div>
+        """
 
-            # Check for contact info
-            has_contact = "✅" if job.get('has_contact') else "❌"
+REPORT_TAIL = """
+        </div>
+    </body>
+    </html>
+    """
 
-            html += f"""
+JOB_CARD = """
                 <div class="job-card">
                     <div class="job-header">
                         <div class="job-meta">
-                            📅 {job['date'][:19]} | 📝 {job.get('word_count', 0)} words | 📞 Contact: {has_contact}
-                            <a href="{job.get('url', '#')}" class="job-link" target="_blank">🔗 View Original</a>
+                            📅 {date} | 📝 {word_count} words | 📞 Contact: {has_contact}
+                            <a href="{url}" class="job-link" target="_blank">🔗 View Original</a>{duplicates}
                         </div>
                     </div>
                     <div class="job-content">
-                        {text.replace('\n', '<br>')}
+                        {text}
                     </div>
                 </div>
             """
 
-        html += """
-                </div>
-            </div>
-        """
+# Markup around a card's and a section's own content, for size estimates
+CARD_SIZE = len(JOB_CARD.encode("utf-8")) + 10
+SECTION_SIZE = len((SECTION_OPEN + SECTION_CLOSE).encode("utf-8")) + 30
 
-    html += """
-        </div>
-    </body>
-    </html>
+HIGHLIGHT = '<span class="keywords">{}</span>'
+
+DUPLICATE_LINK = ' <a href="{url}" class="job-link" target="_blank">🔁 Copy {number}</a>'
+
+
+class HtmlReportBuilder:
+    """Builds the HTML report one job at a time.
+
+    The variable parts of each job card (escaped and highlighted text,
+    links, meta) are prepared as soon as the job is added and kept in its
+    channel's section, so the report never needs the full list of matches.
+    The card markup itself is only produced while the report is written.
     """
 
-    return html
+    def __init__(self, channels=None, aggregate=None):
+        # Sections follow the configured channel order, not arrival order
+        self.sections = {channel: [] for channel in channels or []}
+        # Totals for the summary; counted here unless stream_matches already fills the aggregate
+        self.aggregate = aggregate if aggregate is not None else MatchAggregate(channels)
+        self._counts_matches = aggregate is None
+        self.job_count = 0
+        self.content_size = 0
+        self.generated_at = None  # Fixed at the first render, so every render has the same bytes
+
+    @property
+    def channel_counts(self):
+        return {channel: len(cards) for channel, cards in self.sections.items() if cards}
+
+    def add(self, job):
+        self.job_count += 1
+        if self._counts_matches:
+            self.aggregate.add(job)
+        card = job_card_fields(job)
+        self.content_size += len(card[3]) + len(card[4]) + len(card[5])
+        self.sections.setdefault(job['channel'], []).append(card)
+
+    def estimated_size(self):
+        """Rough size of the HTML in bytes, without rendering it"""
+        if not self.job_count:
+            return len(EMPTY_REPORT)
+        return (len(REPORT_HEAD) + len(REPORT_TAIL) + len(self.channel_counts) * SECTION_SIZE
+                + self.job_count * CARD_SIZE + self.content_size)
+
+    def subset(self, sections):
+        """A report over some of this report's sections, e.g. one page or one channel"""
+        part = HtmlReportBuilder()
+        part.sections = sections
+        part.job_count = sum(len(cards) for cards in sections.values())
+        # Its header counts only its own jobs
+        part.aggregate = MatchAggregate.of_channel_counts({channel: len(cards) for channel, cards in sections.items()
+                                                           if cards})
+        part.content_size = sum(len(card[3]) + len(card[4]) + len(card[5])
+                                for cards in sections.values() for card in cards)
+        return part
+
+    def per_channel(self):
+        return [self.subset({channel: cards}) for channel, cards in self.sections.items() if cards]
+
+    def pages(self, page_jobs):
+        """Split into reports of at most page_jobs jobs, keeping the channel order"""
+        pages = []
+        page = {}
+        size = 0
+        for channel, cards in self.sections.items():
+            start = 0
+            while start < len(cards):
+                take = min(page_jobs - size, len(cards) - start)
+                page.setdefault(channel, []).extend(cards[start:start + take])
+                size += take
+                start += take
+                if size == page_jobs:
+                    pages.append(self.subset(page))
+                    page, size = {}, 0
+        if page:
+            pages.append(self.subset(page))
+        return pages
+
+    def head(self):
+        """The document head and header, shared by every format of this report"""
+        if self.generated_at is None:
+            self.generated_at = datetime.now()
+        return REPORT_HEAD.format(
+            title_time=self.generated_at.strftime('%Y-%m-%d %H:%M'),
+            generated=self.generated_at.strftime('%Y-%m-%d at %H:%M:%S'),
+            job_count=self.aggregate.job_count,
+            channel_count=len(self.aggregate.channel_counts),
+        )
+
+    def chunks(self):
+        """Yield the report in pieces, in the order they appear in the document"""
+        if not self.job_count:
+            yield EMPTY_REPORT
+            return
+
+        yield self.head()
+        for channel, cards in self.sections.items():
+            if not cards:
+                continue
+            yield SECTION_OPEN.format(channel=escape(channel), count=len(cards))
+            for card in cards:
+                yield format_job_card(card)
+            yield SECTION_CLOSE
+        yield REPORT_TAIL
+
+    def write(self, sink):
+        """Write the report chunk by chunk to a text or binary file-like object"""
+        if isinstance(sink, io.TextIOBase):
+            for chunk in self.chunks():
+                sink.write(chunk)
+        else:
+            for chunk in self.chunks():
+                sink.write(chunk.encode("utf-8"))
+
+    def upload_file(self):
+        """In-memory UTF-8 copy of the report, rewound and ready for send_file"""
+        buffer = io.BytesIO()
+        self.write(buffer)
+        buffer.seek(0)
+        return buffer
+
+    def html(self):
+        return "".join(self.chunks())
+
+
+def job_card_fields(job):
+    """(date, word count, has contact, url, duplicate links, text) of a card, all HTML-ready"""
+    # Highlight keywords in one pass over the original text
+    text = highlight_text(job['text'], job.get('spans') or keyword_spans(job['text'], job.get('matched_keywords', [])))
+
+    # Links to cross-posted copies of the same job
+    duplicates = "".join(
+        DUPLICATE_LINK.format(url=url, number=i) for i, url in enumerate(job.get('duplicates', []), 1)
+    )
+
+    return job['date'][:19], job.get('word_count', 0), bool(job.get('has_contact')), job.get('url', '#'), duplicates, text
+
+
+def format_job_card(card):
+    date, word_count, has_contact, url, duplicates, text = card
+    return JOB_CARD.format(
+        date=date,
+        word_count=word_count,
+        has_contact="✅" if has_contact else "❌",
+        url=url,
+        duplicates=duplicates,
+        text=text,
+    )
+
+
+def render_job_card(job):
+    return format_job_card(job_card_fields(job))
+
+
+def highlight_text(text, spans):
+    """Escape text and wrap each (start, end) span, which must be sorted and not overlap"""
+    parts = []
+    last = 0
+    for start, end in spans:
+        parts.append(escape(text[last:start]))
+        parts.append(HIGHLIGHT.format(escape(text[start:end])))
+        last = end
+    parts.append(escape(text[last:]))
+    return "".join(parts).replace('\n', '<br>')
+
+
+def keyword_spans(text, keywords):
+    """Spans for matches that came without them, e.g. from the archive or live mode"""
+    return merge_spans(match.span() for keyword in keywords for match in highlight_pattern(keyword).finditer(text))
+
+
+@lru_cache(maxsize=1024)
+def highlight_pattern(keyword):
+    return re.compile(re.escape(keyword), re.IGNORECASE)
+
+
+def build_report(messages, channels=None, aggregate=None):
+    builder = HtmlReportBuilder(channels, aggregate)
+    for msg in messages:
+        builder.add(msg)
+    return builder
+
+
+def generate_html_report(messages):
+    """Generate a nice HTML report of filtered jobs"""
+    return build_report(messages).html()
 
 
 def save_html_report(messages, filename=None):
-    """Save HTML report to file"""
+    """Save HTML report to file; accepts the matches or an HtmlReportBuilder"""
     if not filename:
         filename = f"job_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.html"
 
-    html_content = generate_html_report(messages)
-
+    builder = messages if isinstance(messages, HtmlReportBuilder) else build_report(messages)
     with open(filename, 'w', encoding='utf-8') as f:
-        f.write(html_content)
+        builder.write(f)
 
     print(f"📄 HTML report saved to {filename}")
-    return filename
\ No newline at end of file
+    return filename
+
+
+def benchmark_report_rendering(job_count=10_000):
+    """Compare one big string plus an encoded copy with writing chunks to the upload buffer"""
+    from job_match import JobMatch
+
+    channels = [f"@channel_{i}" for i in range(10)]
+    builder = build_report(
+        JobMatch(channels[i % len(channels)], i, f"Senior Python developer #{i}\nRemote work, apply via @hr " * 5,
+                 "2025-01-01 00:00:00+00:00", ["Python", "remote work"], True)
+        for i in range(job_count)
+    )
+
+    def whole_string():
+        return io.BytesIO(builder.html().encode("utf-8"))
+
+    for name, render in (("string + encode", whole_string), ("chunked write", builder.upload_file)):
+        tracemalloc.start()
+        start = time.perf_counter()
+        buffer = render()
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"⏱️ {job_count} jobs, {name}: {elapsed * 1000:.0f}ms, peak {peak / 1024 / 1024:.1f} MiB "
+              f"for a {len(buffer.getvalue()) / 1024 / 1024:.1f} MiB report")
+
+    assert builder.upload_file().getvalue() == builder.html().encode("utf-8")
+
+
+def test_highlighting():
+    from job_filter import build_result, find_keyword_spans, normalize_keywords
+
+    text = "Senior Python Developer <remote>\nPython & Go, IT"
+    matched, spans = find_keyword_spans(text, normalize_keywords(["Python", "Python developer", "IT"]))
+    expected = ('Senior <span class="keywords">Python Developer</span> &lt;remote&gt;<br>'
+                '<span class="keywords">Python</span> &amp; Go, <span class="keywords">IT</span>')
+    assert highlight_text(text, spans) == expected
+
+    # Without recorded spans the keywords are located again, still without nesting
+    card = render_job_card(build_result("@jobs", 1, text, "2025-01-01", matched))
+    assert "<remote>" not in card and card.count('<span class="keywords">') == 3
+    print("✅ Highlights come from matcher spans and the text is escaped")
+
+
+if __name__ == "__main__":
+    test_highlighting()
+    benchmark_report_rendering()
@@ -0,0 +1,150 @@
+import hashlib
+import json
+import time
+from collections import OrderedDict, namedtuple
+from typing import Dict, Optional, Set
+
+from aggregate import MatchAggregate
+from job_filter import keyword_key
+
+# What a finished search leaves behind: its totals, the packaged report as
+# (file name, bytes) parts and the newest post id it saw in each channel
+CachedSearch = namedtuple("CachedSearch", "aggregate parts newest_ids size")
+
+
+class ResultCache:
+    """Recent search results with their rendered report, reused by identical searches.
+
+    Entries are keyed by a hash of the channels, normalized keywords,
+    message limit and the fetch marks a search starts from, since the same
+    search from different marks returns different posts. An entry is
+    dropped after `ttl` seconds, as soon as a post newer than the ones it
+    saw turns up in one of its channels, and least recently used first when
+    the cached reports exceed max_bytes or there are more than max_entries.
+    """
+
+    def __init__(self, ttl=300, max_bytes=64 * 1024 * 1024, max_entries=256):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._by_channel: Dict[str, Set[str]] = {}
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.invalidated = 0
+        self.evicted = 0
+        self.bytes_saved = 0
+
+    @staticmethod
+    def key(channels, keywords, limit, marks=()):
+        canonical = json.dumps([list(channels), list(keyword_key(keywords)), limit, list(marks)],
+                               ensure_ascii=False, separators=(",", ":"))
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def get(self, key) -> Optional[CachedSearch]:
+        entry = self.entries.get(key)
+        if entry is not None:
+            result, stored_at = entry
+            if time.monotonic() - stored_at < self.ttl:
+                self.hits += 1
+                self.bytes_saved += result.size
+                self.entries.move_to_end(key)
+                return result
+            self.expired += 1
+            self._drop(key)
+        self.misses += 1
+        return None
+
+    def put(self, key, aggregate: MatchAggregate, parts, newest_ids) -> CachedSearch:
+        """Cache a finished search and return it; reports larger than max_bytes are not kept"""
+        result = CachedSearch(aggregate, parts, dict(newest_ids), sum(len(data) for _, data in parts))
+        self._drop(key)
+        if result.size > self.max_bytes:
+            return result
+
+        self.entries[key] = (result, time.monotonic())
+        self.size += result.size
+        for channel in result.newest_ids:
+            self._by_channel.setdefault(channel, set()).add(key)
+        while self.size > self.max_bytes or len(self.entries) > self.max_entries:
+            self._drop(next(iter(self.entries)))
+            self.evicted += 1
+        return result
+
+    def _drop(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        result, _ = entry
+        self.size -= result.size
+        for channel in result.newest_ids:
+            keys = self._by_channel[channel]
+            keys.discard(key)
+            if not keys:
+                del self._by_channel[channel]
+
+    def channel_updated(self, channel, newest_id):
+        """Forget results that miss posts up to newest_id in channel"""
+        for key in list(self._by_channel.get(channel, ())):
+            result, _ = self.entries[key]
+            if result.newest_ids[channel] < newest_id:
+                self._drop(key)
+                self.invalidated += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "expired": self.expired,
+            "invalidated": self.invalidated,
+            "evicted": self.evicted,
+            "cached_results": len(self.entries),
+            "cached_bytes": self.size,
+            "bytes_saved": self.bytes_saved,
+        }
+
+    def format_stats(self):
+        stats = self.stats()
+        return (f"🗂️ Result cache: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.0%} hit rate, "
+                f"{stats['expired']} expired, {stats['invalidated']} invalidated, {stats['evicted']} evicted), "
+                f"{stats['cached_results']} results in {stats['cached_bytes'] / 1024:.0f} KiB")
+
+
+def test_result_cache():
+    cache = ResultCache(ttl=60, max_bytes=250)
+    aggregate = MatchAggregate.of([{"channel": "@a", "matched_keywords": ["Python"]}])
+
+    key = ResultCache.key(["@a", "@b"], ["Python", " Go "], 50, (0, 0))
+    assert key == ResultCache.key(["@a", "@b"], ["Python", "Go", ""], 50, (0, 0))
+    assert key != ResultCache.key(["@a", "@b"], ["Python", "Go"], 50, (7, 0))
+    assert cache.get(key) is None
+
+    stored = cache.put(key, aggregate, [("jobs.html", b"x" * 100)], {"@a": 10, "@b": 5})
+    assert cache.get(key) is stored and stored.aggregate.job_count == 1
+
+    # Posts the result has already seen keep it, newer ones drop it
+    cache.channel_updated("@b", 5)
+    assert cache.get(key) is stored
+    cache.channel_updated("@b", 6)
+    assert cache.get(key) is None
+
+    # The least recently used results go first once the reports outgrow max_bytes
+    keys = [ResultCache.key(["@c"], ["Go"], limit) for limit in (1, 2, 3)]
+    for k in keys[:2]:
+        cache.put(k, aggregate, [("jobs.html", b"y" * 100)], {"@c": 1})
+    cache.get(keys[0])
+    cache.put(keys[2], aggregate, [("jobs.html", b"z" * 100)], {"@c": 1})
+    assert cache.get(keys[1]) is None and cache.get(keys[0]) and cache.get(keys[2])
+    assert cache.size == 200 and cache.evicted == 1
+
+    cache.ttl = 0
+    assert cache.get(keys[0]) is None and cache.expired == 1
+    print(f"✅ {cache.format_stats()}")
+
+
+if __name__ == "__main__":
+    test_result_cache()
@@ -0,0 +1,178 @@
+import asyncio
+from collections import deque
+from typing import Dict, Hashable, Optional
+
+
+class ScheduledSearch:
+    """One execution of a search, shared by every user whose search coalesced onto it.
+
+    Await it for the result. users lists who asked for it, starting with the
+    user whose state it runs with.
+    """
+
+    def __init__(self, scheduler, key, run, user_id):
+        self.scheduler = scheduler
+        self.key = key
+        self.run = run
+        self.users = [user_id]
+        self.future = asyncio.get_running_loop().create_future()
+        # Mark a failure as retrieved, since coalesced users may never await it
+        self.future.add_done_callback(lambda future: future.cancelled() or future.exception())
+
+    @property
+    def position(self):
+        """1-based place in the queue, 0 once it has started"""
+        try:
+            return self.scheduler._queue.index(self) + 1
+        except ValueError:
+            return 0
+
+    async def positions(self):
+        """Yield the queue position each time it changes, ending when the search starts"""
+        last = None
+        while True:
+            moved = self.scheduler._moved
+            position = self.position
+            if not position:
+                return
+            if position != last:
+                yield position
+                last = position
+            await moved.wait()
+
+    def __await__(self):
+        return asyncio.shield(self.future).__await__()
+
+
+class SearchScheduler:
+    """Runs searches on at most `workers` at a time.
+
+    A user only ever has one search waiting or running; asking again in the
+    meantime is dropped. With one entry per user, the FIFO queue serves users
+    strictly in turn, so nobody can crowd the others out. A search whose key
+    matches one already waiting or running (same channels, keywords, limit
+    and fetch marks) does not run again but shares that one's result.
+    """
+
+    def __init__(self, workers=2):
+        self.workers = workers
+        self._queue = deque()
+        self._by_key: Dict[Hashable, ScheduledSearch] = {}
+        self._active_users: Dict[int, ScheduledSearch] = {}
+        self._running = 0
+        self._moved = asyncio.Event()
+        self.executed = 0
+        self.coalesced = 0
+        self.dropped = 0
+
+    def submit(self, user_id, key, run) -> Optional[ScheduledSearch]:
+        """Schedule `run`, a coroutine function, for user_id.
+
+        Returns the search to await, or None when the user already has one.
+        """
+        if user_id in self._active_users:
+            self.dropped += 1
+            return None
+
+        search = self._by_key.get(key)
+        if search is not None:
+            self.coalesced += 1
+            search.users.append(user_id)
+        else:
+            search = self._by_key[key] = ScheduledSearch(self, key, run, user_id)
+            self._queue.append(search)
+        self._active_users[user_id] = search
+        self._dispatch()
+        return search
+
+    def _dispatch(self):
+        started = False
+        while self._queue and self._running < self.workers:
+            search = self._queue.popleft()
+            self._running += 1
+            asyncio.create_task(self._execute(search))
+            started = True
+        if started:
+            # Wake everyone watching their position
+            self._moved.set()
+            self._moved = asyncio.Event()
+
+    async def _execute(self, search):
+        try:
+            result = await search.run()
+        except Exception as e:
+            search.future.set_exception(e)
+        else:
+            search.future.set_result(result)
+        finally:
+            self.executed += 1
+            self._running -= 1
+            del self._by_key[search.key]
+            for user_id in search.users:
+                self._active_users.pop(user_id, None)
+            self._dispatch()
+
+    def stats(self):
+        return {"executed": self.executed, "coalesced": self.coalesced, "dropped": self.dropped,
+                "running": self._running, "queued": len(self._queue)}
+
+
+async def test_search_scheduler():
+    import gc
+
+    scheduler = SearchScheduler(workers=2)
+    running = 0
+    max_running = 0
+    runs = []
+
+    def search_for(name, delay=0.05, fail=False):
+        async def run():
+            nonlocal running, max_running
+            running += 1
+            max_running = max(max_running, running)
+            runs.append(name)
+            await asyncio.sleep(delay)
+            running -= 1
+            if fail:
+                raise RuntimeError(f"{name} failed")
+            return f"results of {name}"
+        return run
+
+    searches = {user_id: scheduler.submit(user_id, f"key{user_id}", search_for(f"search{user_id}"))
+                for user_id in range(5)}
+    # Repeated taps are dropped, identical searches share one run
+    assert scheduler.submit(0, "key0", search_for("again")) is None
+    shared = scheduler.submit(10, "key4", search_for("same as 4"))
+    assert shared is searches[4] and shared.users == [4, 10]
+    failing = scheduler.submit(11, "bad", search_for("bad", fail=True))
+
+    assert [searches[user_id].position for user_id in range(5)] == [0, 0, 1, 2, 3]
+    seen = [position async for position in searches[4].positions()]
+    # Searches finishing together can move it up more than one place at once
+    assert seen[0] == 3 and seen[-1] == 1 and seen == sorted(seen, reverse=True), seen
+
+    results = await asyncio.gather(*(searches[user_id] for user_id in range(5)), shared)
+    assert results == [f"results of search{i}" for i in range(5)] + ["results of search4"]
+    try:
+        await failing
+        raise AssertionError("The error should reach the caller")
+    except RuntimeError:
+        pass
+
+    assert runs == [f"search{i}" for i in range(5)] + ["bad"] and max_running == 2
+    assert scheduler.stats() == {"executed": 6, "coalesced": 1, "dropped": 1, "running": 0, "queued": 0}
+    assert scheduler.submit(0, "key0", search_for("later")) is not None
+    summary = f"✅ {len(runs)} searches ran for 7 users, at most {max_running} at a time"
+
+    # A failure nobody awaits is not reported as never retrieved
+    errors = []
+    asyncio.get_running_loop().set_exception_handler(lambda loop, context: errors.append(context))
+    scheduler.submit(12, "unawaited", search_for("unawaited", delay=0, fail=True))
+    await asyncio.sleep(0.01)
+    gc.collect()
+    assert not errors, errors
+    print(summary)
+
+
+if __name__ == "__main__":
+    asyncio.run(test_search_scheduler())
@@ -0,0 +1,135 @@
+import asyncio
+import time
+from typing import Any, Dict
+
+from telethon.errors import FloodWaitError, ServerError, TimedOutError
+
+from rate_limiter import TokenBucket
+
+# Errors worth another try; anything else (no rights, bad ids...) fails at once
+RETRYABLE_ERRORS = (ServerError, TimedOutError, OSError, asyncio.TimeoutError)
+
+
+class SendQueue:
+    """Central queue for everything sent through one Telegram account.
+
+    Every destination gets its own FIFO and worker, so its sends arrive in
+    the order they were queued while different destinations proceed side by
+    side. All workers draw from one TokenBucket, so a FloodWait hit by any of
+    them holds back the others too. Other transient errors are retried with
+    exponential backoff.
+    """
+
+    def __init__(self, limiter=None, retries=3, backoff=1.0, max_backoff=30.0):
+        self.limiter = limiter or TokenBucket(1.0)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._queues: Dict[Any, asyncio.Queue] = {}
+        self._workers: Dict[Any, asyncio.Task] = {}
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self.flood_waits = 0
+
+    def submit(self, destination, send) -> asyncio.Future:
+        """Queue `send`, a coroutine function taking no arguments, for destination.
+
+        The returned future resolves to its result once it has been sent.
+        """
+        future = asyncio.get_running_loop().create_future()
+        queue = self._queues.get(destination)
+        if queue is None:
+            queue = self._queues[destination] = asyncio.Queue()
+            self._workers[destination] = asyncio.create_task(self._worker(destination, queue))
+        queue.put_nowait((send, future))
+        return future
+
+    async def _worker(self, destination, queue):
+        try:
+            while not queue.empty():
+                send, future = queue.get_nowait()
+                if future.cancelled():
+                    continue
+                try:
+                    result = await self._send(destination, send)
+                except Exception as e:
+                    if not future.done():
+                        future.set_exception(e)
+                else:
+                    if not future.done():
+                        future.set_result(result)
+        finally:
+            # Nothing is awaited between the last empty() check and this, so no send is lost
+            del self._queues[destination]
+            del self._workers[destination]
+
+    async def _send(self, destination, send):
+        attempt = 0
+        while True:
+            await self.limiter.acquire()
+            try:
+                result = await send()
+                self.sent += 1
+                return result
+            except FloodWaitError as e:
+                self.flood_waits += 1
+                self.limiter.pause(e.seconds)
+                error, delay = e, 0
+            except RETRYABLE_ERRORS as e:
+                error, delay = e, min(self.max_backoff, self.backoff * 2 ** attempt)
+
+            attempt += 1
+            if attempt > self.retries:
+                self.failed += 1
+                print(f"❌ Giving up on a send to {destination} after {self.retries} retries: {error}")
+                raise error
+            self.retried += 1
+            print(f"⏳ Send to {destination} failed ({error}), retrying ({attempt}/{self.retries})")
+            await asyncio.sleep(delay)
+
+    async def join(self):
+        """Wait until every queued send has finished"""
+        while self._workers:
+            await asyncio.gather(*self._workers.values(), return_exceptions=True)
+
+    def stats(self):
+        return {"sent": self.sent, "retried": self.retried, "failed": self.failed, "flood_waits": self.flood_waits,
+                "pending": sum(queue.qsize() for queue in self._queues.values())}
+
+
+async def test_send_queue():
+    class FlakyClient:
+        def __init__(self):
+            self.calls = []
+            self.errors = {"@b": [FloodWaitError(request=None, capture=0), ServerError(request=None, message="")]}
+
+        async def forward_messages(self, entity, messages, from_peer):
+            await asyncio.sleep(0.01)
+            errors = self.errors.get(entity)
+            if errors:
+                raise errors.pop(0)
+            self.calls.append((entity, from_peer, list(messages)))
+            return messages
+
+    client = FlakyClient()
+    queue = SendQueue(TokenBucket(rate=200), retries=3, backoff=0.01)
+
+    def forward(destination, channel, ids):
+        return queue.submit(destination, lambda: client.forward_messages(destination, ids, channel))
+
+    start = time.perf_counter()
+    futures = [forward(destination, channel, [i]) for i in range(3)
+               for destination in ("@a", "@b") for channel in ("@x", "@y")]
+    await asyncio.gather(*futures)
+    await queue.join()
+
+    for destination in ("@a", "@b"):
+        sent = [(channel, ids) for entity, channel, ids in client.calls if entity == destination]
+        assert sent == [(channel, [i]) for i in range(3) for channel in ("@x", "@y")], sent
+    assert queue.stats() == {"sent": 12, "retried": 2, "failed": 0, "flood_waits": 1, "pending": 0}, queue.stats()
+    print(f"✅ Sends stay in order per destination through retries ({time.perf_counter() - start:.2f}s)")
+
+
+if __name__ == "__main__":
+    asyncio.run(test_send_queue())
@@ -1,17 +1,237 @@
+import asyncio
 import os
+import queue
+import threading
+import time
+from functools import lru_cache
+
 import gspread
 from google.oauth2.service_account import Credentials
+from gspread.exceptions import APIError
+
+SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
+# Columns the dedupe keys are read back from (1-based): channel and message id
+CHANNEL_COLUMN, ID_COLUMN = 2, 4
+_STOP = object()
+
+
+@lru_cache(maxsize=None)
+def get_client(creds_path):
+    """One authorized gspread client per credentials file for the whole process"""
+    creds = Credentials.from_service_account_file(creds_path, scopes=SCOPES)
+    return gspread.authorize(creds)
+
+
+def open_sheet(sheet_id=None, creds_path=None):
+    sheet_id = sheet_id or os.getenv("SHEET_ID")
+    creds_path = creds_path or os.getenv("SHEET_CREDENTIALS")
+    return get_client(creds_path).open_by_key(sheet_id).sheet1
+
+
+def is_retryable(error):
+    # Quota (429) and server errors pass; bad requests or permissions will not
+    if isinstance(error, APIError):
+        return error.code == 429 or error.code >= 500
+    return isinstance(error, OSError)
+
+
+def _off_loop(function, *args):
+    """Run a blocking call in a thread when inside the event loop, else right away"""
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        function(*args)
+        return None
+    return loop.run_in_executor(None, function, *args)
+
+
+class SheetLogger:
+    """Appends matches to the sheet from a background worker thread.
+
+    add() only puts a row on a bounded queue; the worker collects up to
+    `batch_size` rows (or whatever arrived within `flush_interval`) and
+    writes them with a single append_rows call, backing off and retrying on
+    quota and server errors. Rows already in the sheet are skipped, keyed by
+    channel and message id. When the queue is full, add() returns an
+    awaitable so the pipeline waits without blocking the event loop.
+    `open_worksheet` returns the worksheet to write to and is only called
+    on the worker thread.
+    """
+
+    def __init__(self, batch_size=500, max_queue=5000, flush_interval=2.0, retries=5, backoff=1.0,
+                 max_backoff=60.0, open_worksheet=open_sheet):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.open_worksheet = open_worksheet
+        self.sheet = None
+        self.rows = queue.Queue(maxsize=max_queue)
+        self.logged = set()  # (channel, message id) pairs in the sheet; worker thread only
+        self.count = 0
+        self.skipped = 0
+        self.retried = 0
+        self.failed = 0
+        self._thread = None
+
+    @staticmethod
+    def _row(msg):
+        return [msg["date"], msg["channel"], msg["text"], str(msg["id"]), msg.get("url", "")]
+
+    def add(self, msg):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="sheets-writer", daemon=True)
+            self._thread.start()
+        row = self._row(msg)
+        try:
+            self.rows.put_nowait(row)
+        except queue.Full:
+            return _off_loop(self.rows.put, row)
+
+    def _run(self):
+        while True:
+            item = self.rows.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    item = self.rows.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    self._write(batch)
+                    return
+                batch.append(item)
+            self._write(batch)
+
+    def _connect(self):
+        self.sheet = self.open_worksheet()
+        channels = self.sheet.col_values(CHANNEL_COLUMN)
+        ids = self.sheet.col_values(ID_COLUMN)
+        self.logged.update(zip(channels, ids))
+
+    def _write(self, batch):
+        try:
+            if self.sheet is None:
+                self._connect()
+        except Exception as e:
+            self.failed += len(batch)
+            print(f"❌ Could not open the Google Sheet, {len(batch)} rows not logged: {e}")
+            return
+
+        rows = []
+        for row in batch:
+            key = (row[1], row[3])
+            if key in self.logged:
+                self.skipped += 1
+                continue
+            self.logged.add(key)
+            rows.append(row)
+        if not rows:
+            return
+
+        attempt = 0
+        while True:
+            try:
+                self.sheet.append_rows(rows, value_input_option="RAW")
+                self.count += len(rows)
+                return
+            except Exception as e:
+                attempt += 1
+                if not is_retryable(e) or attempt > self.retries:
+                    self.failed += len(rows)
+                    # Not in the sheet after all, so a later run may log them
+                    self.logged.difference_update((row[1], row[3]) for row in rows)
+                    print(f"❌ Failed to log {len(rows)} rows to Google Sheet: {e}")
+                    return
+                self.retried += 1
+                delay = min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+                print(f"⏳ Google Sheet write failed ({e}), retrying in {delay:.0f}s ({attempt}/{self.retries})")
+                time.sleep(delay)
+
+    def _finish(self):
+        if self._thread is not None:
+            self.rows.put(_STOP)
+            self._thread.join()
+            self._thread = None
+        if self.count or self.skipped:
+            print(f"📊 Logged {self.count} messages to Google Sheet ({self.skipped} already there)")
+
+    def close(self):
+        """Write what is queued and stop the worker; awaitable inside the event loop"""
+        return _off_loop(self._finish)
+
 
 def log_to_sheet(messages):
     if not messages:
         return
 
-    sheet_id = os.getenv("SHEET_ID")
-    creds_path = os.getenv("SHEET_CREDENTIALS")
-    creds = Credentials.from_service_account_file(creds_path, scopes=["https://www.googleapis.com/auth/spreadsheets"])
-    client = gspread.authorize(creds)
-    sheet = client.open_by_key(sheet_id).sheet1
+    logger = SheetLogger()
+    for msg in messages:
+        logger.add(msg)
+    logger.close()
+
+
+class FakeWorksheet:
+    """In-memory stand-in for a gspread worksheet, failing the first writes with quota errors"""
+
+    class QuotaResponse:
+        text = "Quota exceeded"
+
+        def json(self):
+            return {"error": {"code": 429, "message": "Quota exceeded", "status": "RESOURCE_EXHAUSTED"}}
+
+    def __init__(self, quota_errors=0, write_delay=0.0):
+        self.data = []
+        self.calls = 0
+        self.quota_errors = quota_errors
+        self.write_delay = write_delay
+
+    def append_rows(self, values, value_input_option=None):
+        time.sleep(self.write_delay)
+        if self.quota_errors:
+            self.quota_errors -= 1
+            raise APIError(self.QuotaResponse())
+        self.calls += 1
+        self.data.extend(list(row) for row in values)
+
+    def col_values(self, col):
+        return [row[col - 1] for row in self.data if len(row) >= col]
+
+
+async def test_sheet_logger():
+    from utils import LoopLagProbe
+
+    jobs = [{"date": "2025-01-01 10:00", "channel": f"@c{i % 3}", "id": i // 3, "text": f"job {i}"}
+            for i in range(3000)]
+    sheet = FakeWorksheet(quota_errors=2, write_delay=0.05)
+    logger = SheetLogger(batch_size=500, max_queue=200, backoff=0.01, open_worksheet=lambda: sheet)
+
+    async with LoopLagProbe() as probe:
+        start = time.perf_counter()
+        for msg in jobs + jobs[:100]:  # The repeats are skipped
+            result = logger.add(msg)
+            if result is not None:
+                await result
+        await logger.close()
+        elapsed = time.perf_counter() - start
+
+    assert len(sheet.data) == len(jobs) and len({(row[1], row[3]) for row in sheet.data}) == len(jobs)
+    assert logger.retried == 2 and logger.skipped == 100 and logger.failed == 0
+    assert probe.max() < 0.05, probe.max()
+
+    # A later run against the same sheet finds the rows already there
+    again = SheetLogger(open_worksheet=lambda: sheet)
+    for msg in jobs[:10] + [{"date": "", "channel": "@new", "id": 1, "text": "new"}]:
+        again.add(msg)
+    await again.close()
+    assert len(sheet.data) == len(jobs) + 1 and again.skipped == 10
+    print(f"✅ {len(jobs)} rows logged in {sheet.calls} writes in {elapsed:.2f}s, "
+          f"max loop lag {probe.max() * 1000:.1f}ms")
+
 
-    rows = [[m["date"], m["channel"], m["text"]] for m in messages]
-    sheet.append_rows(rows)
-    print(f"📊 Logged {len(messages)} messages to Google Sheet")
+if __name__ == "__main__":
+    asyncio.run(test_sheet_logger())
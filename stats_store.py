@@ -0,0 +1,263 @@
+import copy
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime, timedelta
+
+HOUR_FORMAT = '%Y-%m-%d %H'
+DAY_FORMAT = '%Y-%m-%d'
+MONTH_FORMAT = '%Y-%m'
+
+
+class StatsStore:
+    """SQLite storage for job statistics with time-bucketed rollups.
+
+    Each update adds its counts to running totals and to the bucket of the
+    current hour with upserts, so a write touches only the rows of that
+    update however long the history is. Compaction folds hour buckets older
+    than hour_retention into days and days older than day_retention into
+    months, which keeps the number of rows bounded. Several scopes (e.g. one
+    per bot user) can share a database; see for_scope.
+    """
+
+    def __init__(self, db_path="job_stats.db", hour_retention=timedelta(hours=48),
+                 day_retention=timedelta(days=400), compact_every=3600, scope=""):
+        self.db_path = db_path
+        self.scope = scope
+        self.hour_retention = hour_retention
+        self.day_retention = day_retention
+        self.compact_every = compact_every
+        self._compacted_at = {}  # Scope -> last compaction; shared with the views of for_scope
+
+        self.db = sqlite3.connect(db_path)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS totals (
+                scope TEXT NOT NULL,
+                name TEXT NOT NULL,
+                value,
+                PRIMARY KEY (scope, name)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS counts (
+                scope TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                name TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (scope, kind, name)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS buckets (
+                scope TEXT NOT NULL,
+                granularity TEXT NOT NULL,
+                start TEXT NOT NULL,
+                jobs INTEGER NOT NULL,
+                PRIMARY KEY (scope, granularity, start)
+            ) WITHOUT ROWID;
+        """)
+
+    def close(self):
+        self.db.close()
+
+    def for_scope(self, scope):
+        """The same database seen through another scope"""
+        view = copy.copy(self)
+        view.scope = str(scope)
+        return view
+
+    def record(self, job_count, with_contact, channel_counts, keyword_counts, when=None):
+        """Add one update's counts; cost depends only on its channels and keywords"""
+        if not job_count:
+            return
+        when = when or datetime.now()
+
+        with self.db:
+            self.db.executemany(
+                "INSERT INTO totals (scope, name, value) VALUES (?, ?, ?) "
+                "ON CONFLICT (scope, name) DO UPDATE SET value = value + excluded.value",
+                [(self.scope, "total_jobs_found", job_count), (self.scope, "jobs_with_contact", with_contact)],
+            )
+            self.db.execute("INSERT OR REPLACE INTO totals (scope, name, value) VALUES (?, 'last_updated', ?)",
+                            (self.scope, when.isoformat()))
+            self.db.executemany(
+                "INSERT INTO counts (scope, kind, name, count) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (scope, kind, name) DO UPDATE SET count = count + excluded.count",
+                [(self.scope, "channel", name, count) for name, count in channel_counts.items()]
+                + [(self.scope, "keyword", name, count) for name, count in keyword_counts.items()],
+            )
+            self.db.execute(
+                "INSERT INTO buckets (scope, granularity, start, jobs) VALUES (?, 'hour', ?, ?) "
+                "ON CONFLICT (scope, granularity, start) DO UPDATE SET jobs = jobs + excluded.jobs",
+                (self.scope, when.strftime(HOUR_FORMAT), job_count),
+            )
+
+        if time.monotonic() - self._compacted_at.get(self.scope, float("-inf")) >= self.compact_every:
+            self.compact(when)
+
+    def _roll_up(self, source, target, target_length, before):
+        self.db.execute(
+            f"INSERT INTO buckets (scope, granularity, start, jobs) "
+            f"SELECT scope, ?, substr(start, 1, {target_length}), SUM(jobs) FROM buckets "
+            f"WHERE scope = ? AND granularity = ? AND start < ? GROUP BY 3 "
+            f"ON CONFLICT (scope, granularity, start) DO UPDATE SET jobs = jobs + excluded.jobs",
+            (target, self.scope, source, before),
+        )
+        self.db.execute("DELETE FROM buckets WHERE scope = ? AND granularity = ? AND start < ?",
+                        (self.scope, source, before))
+
+    def compact(self, now=None):
+        """Fold old hours into days and old days into months"""
+        now = now or datetime.now()
+        with self.db:
+            self._roll_up("hour", "day", len("YYYY-MM-DD"), (now - self.hour_retention).strftime(HOUR_FORMAT))
+            self._roll_up("day", "month", len("YYYY-MM"), (now - self.day_retention).strftime(DAY_FORMAT))
+        self._compacted_at[self.scope] = time.monotonic()
+
+    def total(self, name, default=0):
+        row = self.db.execute("SELECT value FROM totals WHERE scope = ? AND name = ?", (self.scope, name)).fetchone()
+        return row[0] if row else default
+
+    def top(self, kind, limit=3):
+        return self.db.execute(
+            "SELECT name, count FROM counts WHERE scope = ? AND kind = ? ORDER BY count DESC, name LIMIT ?",
+            (self.scope, kind, limit),
+        ).fetchall()
+
+    def counts(self, kind):
+        return dict(self.db.execute("SELECT name, count FROM counts WHERE scope = ? AND kind = ?", (self.scope, kind)))
+
+    def jobs_since(self, since):
+        """Jobs counted from `since` on, exact to the precision of the buckets that cover it"""
+        return self.db.execute(
+            "SELECT COALESCE(SUM(jobs), 0) FROM buckets WHERE scope = ? AND ("
+            "(granularity = 'hour' AND start >= ?) OR (granularity = 'day' AND start >= ?) "
+            "OR (granularity = 'month' AND start >= ?))",
+            (self.scope, since.strftime(HOUR_FORMAT), since.strftime(DAY_FORMAT), since.strftime(MONTH_FORMAT)),
+        ).fetchone()[0]
+
+    def recent_jobs(self, days, now=None):
+        """Jobs found today and on the days - 1 calendar days before it"""
+        today = (now or datetime.now()).replace(hour=0, minute=0, second=0, microsecond=0)
+        return self.jobs_since(today - timedelta(days=days - 1))
+
+    def daily_counts(self):
+        """Jobs per day for the periods still kept at day or hour precision"""
+        return dict(self.db.execute(
+            "SELECT substr(start, 1, 10), SUM(jobs) FROM buckets WHERE scope = ? AND granularity IN ('hour', 'day') "
+            "GROUP BY 1 ORDER BY 1", (self.scope,)
+        ))
+
+    def bucket_count(self):
+        return self.db.execute("SELECT COUNT(*) FROM buckets WHERE scope = ?", (self.scope,)).fetchone()[0]
+
+    def import_json(self, json_file):
+        """Load the counts of a stats file written by the old JSON storage"""
+        with open(json_file, 'r', encoding='utf-8') as f:
+            stats = json.load(f)
+
+        with self.db:
+            self.db.executemany(
+                "INSERT INTO totals (scope, name, value) VALUES (?, ?, ?) "
+                "ON CONFLICT (scope, name) DO UPDATE SET value = value + excluded.value",
+                [(self.scope, "total_jobs_found", stats.get("total_jobs_found", 0)),
+                 (self.scope, "jobs_with_contact", stats.get("jobs_with_contact", 0))],
+            )
+            if stats.get("last_updated"):
+                self.db.execute("INSERT OR REPLACE INTO totals (scope, name, value) VALUES (?, 'last_updated', ?)",
+                                (self.scope, stats["last_updated"]))
+            self.db.executemany(
+                "INSERT INTO counts (scope, kind, name, count) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (scope, kind, name) DO UPDATE SET count = count + excluded.count",
+                [(self.scope, "channel", name, count) for name, count in stats.get("channels_stats", {}).items()]
+                + [(self.scope, "keyword", name, count) for name, count in stats.get("keyword_stats", {}).items()],
+            )
+            self.db.executemany(
+                "INSERT INTO buckets (scope, granularity, start, jobs) VALUES (?, 'day', ?, ?) "
+                "ON CONFLICT (scope, granularity, start) DO UPDATE SET jobs = jobs + excluded.jobs",
+                [(self.scope, day, jobs) for day, jobs in stats.get("daily_stats", {}).items()],
+            )
+        self.compact()
+
+
+def benchmark_stats_writes(days=3000, updates=200):
+    """Time one update against a long history: old JSON rewrite vs the store"""
+    import tempfile
+
+    start_day = datetime(2017, 1, 1)
+    history = {
+        "total_jobs_found": days * 5,
+        "channels_stats": {f"@channel_{i}": days for i in range(50)},
+        "keyword_stats": {f"keyword_{i}": days for i in range(200)},
+        "daily_stats": {(start_day + timedelta(days=i)).strftime(DAY_FORMAT): 5 for i in range(days)},
+        "jobs_with_contact": days,
+        "last_updated": None,
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        json_file = os.path.join(tmp, "job_stats.json")
+        begin = time.perf_counter()
+        for _ in range(updates):
+            history["total_jobs_found"] += 3
+            with open(json_file, 'w', encoding='utf-8') as f:
+                json.dump(history, f, indent=2, ensure_ascii=False)
+        json_time = (time.perf_counter() - begin) / updates
+
+        store = StatsStore(os.path.join(tmp, "job_stats.db"))
+        store.import_json(json_file)
+        begin = time.perf_counter()
+        for _ in range(updates):
+            store.record(3, 1, {"@channel_1": 3}, {"keyword_1": 2, "keyword_2": 1})
+        store_time = (time.perf_counter() - begin) / updates
+        rows = store.bucket_count()
+        store.close()
+
+    print(f"⏱️ One update with {days} days of history: JSON rewrite {json_time * 1000:.2f}ms, "
+          f"store {store_time * 1000:.2f}ms ({rows} time buckets kept)")
+
+
+def test_rollups():
+    store = StatsStore(":memory:", compact_every=10 ** 9)
+    now = datetime(2025, 6, 15, 12, 30)
+
+    times = [now - timedelta(hours=hours_ago) for hours_ago in range(0, 24 * 900, 6)]
+    for when in times:
+        store.record(1, 0, {"@a": 1}, {"Python": 1}, when=when)
+    store.record(2, 1, {"@b": 2}, {"Go": 2}, when=now)
+    total = store.total("total_jobs_found")
+
+    store.compact(now)
+    granularities = dict(store.db.execute("SELECT granularity, COUNT(*) FROM buckets GROUP BY 1"))
+    other = store.for_scope(42)
+    other.record(5, 5, {"@c": 5}, {"Rust": 5}, when=now)
+    assert other.recent_jobs(1, now) == 5 and other.top("channel") == [("@c", 5)]
+    assert granularities["hour"] <= 49 and granularities["day"] <= 401 and granularities["month"] <= 30
+    assert store.jobs_since(datetime(2000, 1, 1)) == total
+
+    # Recent days are counted by date, not by how many keys happen to exist
+    for days in (1, 7, 30):
+        since = datetime(2025, 6, 16) - timedelta(days=days)
+        assert store.recent_jobs(days, now) == sum(when >= since for when in times) + 2, days
+    assert store.top("channel") == [("@a", len(times)), ("@b", 2)]
+    print(f"✅ Stats roll up into {store.bucket_count()} buckets and answer date ranges")
+
+
+def test_compaction_interval():
+    compactions = []
+
+    class CountingStore(StatsStore):
+        def compact(self, now=None):
+            compactions.append(self.scope)
+            super().compact(now)
+
+    store = CountingStore(":memory:", compact_every=3600)
+
+    # Every write through a fresh view of the same scope shares one compaction clock
+    for _ in range(5):
+        store.for_scope(7).record(1, 0, {"@a": 1}, {"Python": 1})
+    store.for_scope(8).record(1, 0, {"@a": 1}, {"Python": 1})
+    assert compactions == ["7", "8"], compactions
+    print("✅ Compaction runs once per scope and interval")
+
+
+if __name__ == "__main__":
+    test_rollups()
+    test_compaction_interval()
+    benchmark_stats_writes()
@@ -0,0 +1,202 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+from aggregate import MatchAggregate
+from job_stats import JobStats
+from stats_store import StatsStore
+
+
+class StatsWriter:
+    """Background writer for every bot user's statistics.
+
+    Handlers only merge a search's MatchAggregate into that user's pending
+    totals, which never touches the disk. A background task writes all
+    dirty users in one go every `interval` seconds, or sooner once
+    `max_pending` users are waiting. The SQLite work runs on a single worker
+    thread that owns the connection, so a slow disk never stalls the event
+    loop. close() writes whatever is still pending.
+    """
+
+    def __init__(self, db_path="user_stats.db", interval=5.0, max_pending=100, store_factory=StatsStore):
+        self.db_path = db_path
+        self.store_factory = store_factory
+        self.interval = interval
+        self.max_pending = max_pending
+        self.pending: Dict[int, MatchAggregate] = {}
+        self.flushes = 0
+        self.users_written = 0
+
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="stats-writer")
+        self._store: Optional[StatsStore] = None
+        self._views: Dict[int, StatsStore] = {}
+        self._wake = asyncio.Event()
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def record(self, user_id, aggregate):
+        """Queue a search's totals for the user; returns at once"""
+        if not aggregate.job_count:
+            return
+        self.pending.setdefault(user_id, MatchAggregate()).merge(aggregate)
+        if len(self.pending) >= self.max_pending:
+            self._wake.set()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"❌ Failed to save user stats: {e}")
+
+    async def _in_thread(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+
+    def _user_store(self, user_id):
+        # Only ever called on the writer thread, which owns the connection
+        if self._store is None:
+            self._store = self.store_factory(self.db_path)
+        view = self._views.get(user_id)
+        if view is None:
+            view = self._views[user_id] = self._store.for_scope(user_id)
+        return view
+
+    def _write(self, batch):
+        for user_id, aggregate in batch.items():
+            JobStats(store=self._user_store(user_id)).add_aggregate(aggregate)
+
+    async def flush(self):
+        """Write every pending user now"""
+        if not self.pending:
+            return
+        batch, self.pending = self.pending, {}
+        try:
+            await self._in_thread(self._write, batch)
+        except Exception:
+            # Put the totals back so the next flush tries again
+            for user_id, aggregate in batch.items():
+                self.pending.setdefault(user_id, MatchAggregate()).merge(aggregate)
+            raise
+        self.flushes += 1
+        self.users_written += len(batch)
+
+    def _summary(self, user_id):
+        stats = JobStats(store=self._user_store(user_id))
+        return stats.get_summary() if stats.store.total("total_jobs_found") else None
+
+    async def summary(self, user_id) -> Optional[str]:
+        """The user's /stats text, or None before their first match"""
+        if user_id in self.pending:
+            await self.flush()
+        return await self._in_thread(self._summary, user_id)
+
+    def _close_store(self):
+        if self._store is not None:
+            self._store.close()
+            self._store = None
+            self._views.clear()
+
+    async def close(self):
+        """Stop the background task and write what is left"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+        await self._in_thread(self._close_store)
+        self._executor.shutdown(wait=True)
+
+
+async def benchmark_handler_latency(searches=200, write_delay=0.02):
+    """Loop lag while searches record stats on a slow disk, inline vs through the writer"""
+    import os
+    import tempfile
+
+    from utils import LoopLagProbe
+
+    class SlowStore(StatsStore):
+        def record(self, *args, **kwargs):
+            time.sleep(write_delay)  # A disk that takes write_delay per commit
+            super().record(*args, **kwargs)
+
+    aggregate = MatchAggregate.of([{"channel": "@jobs", "matched_keywords": ["Python"], "has_contact": True}] * 5)
+
+    async def measure(record):
+        async with LoopLagProbe() as probe:
+            for i in range(searches):
+                record(i % 50, aggregate)
+                await asyncio.sleep(0.001)  # The rest of the handler
+        return probe.p99()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SlowStore(os.path.join(tmp, "inline.db"))
+        inline_p99 = await measure(lambda user_id, agg: JobStats(store=store.for_scope(user_id)).add_aggregate(agg))
+        store.close()
+
+        writer = StatsWriter(os.path.join(tmp, "user_stats.db"), interval=0.05, store_factory=SlowStore)
+        writer.start()
+        writer_p99 = await measure(writer.record)
+        await writer.close()
+
+        check = StatsStore(writer.db_path)
+        written = sum(check.for_scope(user_id).total("total_jobs_found") for user_id in range(50))
+        check.close()
+
+    assert written == searches * aggregate.job_count, written
+    print(f"⏱️ {searches} searches with {write_delay * 1000:.0f}ms writes: loop lag p99 inline "
+          f"{inline_p99 * 1000:.1f}ms, with the writer {writer_p99 * 1000:.1f}ms "
+          f"({writer.flushes} flushes)")
+
+
+async def test_flush_on_close():
+    import os
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        writer = StatsWriter(os.path.join(tmp, "user_stats.db"), interval=3600)
+        writer.start()
+        writer.record(1, MatchAggregate.of([{"channel": "@a", "matched_keywords": ["Go"]}] * 3))
+        writer.record(2, MatchAggregate.of([{"channel": "@b", "matched_keywords": ["Python"]}]))
+        assert await writer.summary(3) is None
+        assert "Total jobs found: 3" in await writer.summary(1)
+
+        writer.record(2, MatchAggregate.of([{"channel": "@b", "matched_keywords": ["Python"]}]))
+        await writer.close()
+
+        reopened = StatsWriter(writer.db_path)
+        assert "Total jobs found: 2" in await reopened.summary(2)
+        await reopened.close()
+    print("✅ Pending stats are written on close")
+
+
+def test_compaction_per_flush():
+    compactions = []
+
+    class CountingStore(StatsStore):
+        def compact(self, now=None):
+            compactions.append(self.scope)
+            super().compact(now)
+
+    writer = StatsWriter(":memory:", store_factory=CountingStore)
+    aggregate = MatchAggregate.of([{"channel": "@a", "matched_keywords": ["Go"]}])
+    for _ in range(5):
+        writer._write({1: aggregate, 2: aggregate})
+    assert compactions == ["1", "2"], compactions
+    writer._close_store()
+    writer._executor.shutdown()
+    print("✅ Consecutive flushes compact each user once")
+
+
+if __name__ == "__main__":
+    asyncio.run(test_flush_on_close())
+    test_compaction_per_flush()
+    asyncio.run(benchmark_handler_latency())
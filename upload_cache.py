@@ -0,0 +1,144 @@
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+
+from telethon.errors import FilePart0MissingError, FilePartMissingError, FilePartsInvalidError
+from telethon.tl.types import DocumentAttributeFilename
+
+# Telegram drops uploaded parts that were never attached after a while, so
+# handles are only reused for a conservative fraction of that time
+DEFAULT_TTL = 30 * 60
+STALE_UPLOAD_ERRORS = (FilePartMissingError, FilePart0MissingError, FilePartsInvalidError)
+
+
+class UploadCache:
+    """Content-addressed cache of uploaded files.
+
+    The first send of some bytes uploads them once with client.upload_file;
+    later sends of the same bytes from the same client reuse the returned
+    InputFile handle, so a report fanned out to many chats or resent after a
+    failure is only uploaded once. Handles expire after `ttl` seconds and are
+    dropped (and the bytes uploaded again) if Telegram no longer has them.
+    """
+
+    def __init__(self, ttl=DEFAULT_TTL, max_entries=256):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._locks = {}
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.bytes_uploaded = 0
+        self.bytes_saved = 0
+
+    @staticmethod
+    def _key(client, data):
+        # Handles belong to the session that uploaded them
+        return id(client), hashlib.sha256(data).hexdigest()
+
+    async def input_file(self, client, data: bytes, file_name):
+        key = self._key(client, data)
+        # Concurrent sends of the same bytes wait for one upload
+        async with self._locks.setdefault(key, asyncio.Lock()):
+            entry = self.entries.get(key)
+            if entry is not None:
+                handle, uploaded_at = entry
+                if time.monotonic() - uploaded_at < self.ttl:
+                    self.hits += 1
+                    self.bytes_saved += len(data)
+                    self.entries.move_to_end(key)
+                    return handle
+                self.expired += 1
+                del self.entries[key]
+
+            self.misses += 1
+            handle = await client.upload_file(data, file_name=file_name)
+            self.bytes_uploaded += len(data)
+            self.entries[key] = (handle, time.monotonic())
+            while len(self.entries) > self.max_entries:
+                old_key, _ = self.entries.popitem(last=False)
+                self._locks.pop(old_key, None)
+            return handle
+
+    def invalidate(self, client, data: bytes):
+        self.entries.pop(self._key(client, data), None)
+
+    async def send_file(self, client, chat, data: bytes, file_name, **kwargs):
+        """client.send_file for in-memory bytes, uploading them only when needed"""
+        kwargs.setdefault("force_document", True)
+        kwargs.setdefault("attributes", [DocumentAttributeFilename(file_name=file_name)])
+
+        handle = await self.input_file(client, data, file_name)
+        try:
+            return await client.send_file(chat, handle, **kwargs)
+        except STALE_UPLOAD_ERRORS:
+            self.invalidate(client, data)
+            handle = await self.input_file(client, data, file_name)
+            return await client.send_file(chat, handle, **kwargs)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "cached_files": len(self.entries),
+            "bytes_uploaded": self.bytes_uploaded,
+            "bytes_saved": self.bytes_saved,
+        }
+
+    def format_stats(self):
+        stats = self.stats()
+        return (f"📦 Upload cache: {stats['hits']} hits, {stats['misses']} misses "
+                f"({stats['hit_rate']:.0%} hit rate, {stats['expired']} expired), "
+                f"{stats['bytes_uploaded'] / 1024:.0f} KiB uploaded, {stats['bytes_saved'] / 1024:.0f} KiB saved")
+
+
+# Shared by the forwarder and the bot so repeated sends within a process hit
+upload_cache = UploadCache()
+
+
+async def test_upload_reuse():
+    class FakeClient:
+        def __init__(self):
+            self.uploads = 0
+            self.sent = []
+            self.fail_next = False
+
+        async def upload_file(self, data, file_name=None):
+            self.uploads += 1
+            return ("handle", self.uploads, file_name)
+
+        async def send_file(self, chat, file, **kwargs):
+            if self.fail_next:
+                self.fail_next = False
+                raise FilePartMissingError(request=None, capture=0)
+            self.sent.append((chat, file))
+
+    client = FakeClient()
+    cache = UploadCache(ttl=60)
+    report = b"<html>" + b"job " * 1000 + b"</html>"
+
+    await asyncio.gather(*(cache.send_file(client, chat, report, "report.html") for chat in range(5)))
+    await cache.send_file(client, 9, b"another file", "jobs.txt")
+    assert client.uploads == 2 and len(client.sent) == 6
+    assert {file for _, file in client.sent[:5]} == {("handle", 1, "report.html")}
+
+    # A handle Telegram has forgotten is uploaded again
+    client.fail_next = True
+    await cache.send_file(client, 6, report, "report.html")
+    assert client.uploads == 3 and client.sent[-1] == (6, ("handle", 3, "report.html"))
+
+    # Expired handles and other clients upload again
+    cache.ttl = 0
+    await cache.send_file(client, 7, report, "report.html")
+    await cache.send_file(FakeClient(), 8, report, "report.html")
+    assert cache.stats()["expired"] == 1 and cache.hits == 5 and cache.misses == 5, cache.stats()
+    print(f"✅ {cache.format_stats()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(test_upload_reuse())
@@ -0,0 +1,165 @@
+import json
+import sqlite3
+import time
+from collections import Counter
+from typing import Dict, Set
+
+from job_filter import compiled_matcher, keyword_key, normalize_keywords
+
+
+class UserConfigStore:
+    """SQLite storage for every bot user's channels and keywords.
+
+    Each config is one JSON row keyed by user id, so saving a user rewrites
+    only that row and startup reads the whole table in a single query. The
+    row also keeps whether the user turned live mode on.
+    """
+
+    def __init__(self, db_path="user_configs.db"):
+        self.db_path = db_path
+        self.db = sqlite3.connect(db_path)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS user_configs (
+                user_id INTEGER PRIMARY KEY,
+                config TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                live INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        columns = [row[1] for row in self.db.execute("PRAGMA table_info(user_configs)")]
+        if "live" not in columns:  # Databases from before live mode was stored
+            self.db.execute("ALTER TABLE user_configs ADD COLUMN live INTEGER NOT NULL DEFAULT 0")
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+    def __len__(self):
+        return self.db.execute("SELECT COUNT(*) FROM user_configs").fetchone()[0]
+
+    def load_all(self) -> Dict[int, Dict]:
+        return {user_id: json.loads(config)
+                for user_id, config in self.db.execute("SELECT user_id, config FROM user_configs")}
+
+    def save(self, user_id, config):
+        self.save_many({user_id: config})
+
+    def save_many(self, configs: Dict[int, Dict]):
+        now = time.time()
+        with self.db:
+            # An upsert, so saving a config keeps the user's live mode setting
+            self.db.executemany("INSERT INTO user_configs (user_id, config, updated_at) VALUES (?, ?, ?) "
+                                "ON CONFLICT (user_id) DO UPDATE SET config = excluded.config, "
+                                "updated_at = excluded.updated_at",
+                                [(user_id, json.dumps(config, ensure_ascii=False), now)
+                                 for user_id, config in configs.items()])
+
+    def set_live(self, user_id, live):
+        with self.db:
+            self.db.execute("UPDATE user_configs SET live = ? WHERE user_id = ?", (int(live), user_id))
+
+    def live_users(self) -> Set[int]:
+        return {user_id for user_id, in self.db.execute("SELECT user_id FROM user_configs WHERE live")}
+
+    def delete(self, user_id):
+        with self.db:
+            self.db.execute("DELETE FROM user_configs WHERE user_id = ?", (user_id,))
+
+
+def warm_matchers(configs, limit=50):
+    """Compile the matchers of the most widely shared keyword lists ahead of the first search.
+
+    The rest are compiled by compiled_matcher when first used.
+    """
+    shared = Counter(keyword_key(config["keywords"]) for config in configs)
+    for keywords, _ in shared.most_common(limit):
+        compiled_matcher(keywords)
+    return min(limit, len(shared))
+
+
+def benchmark_startup(users=10000, presets=40):
+    """Startup and first-search matcher latency with many stored users"""
+    import os
+    import random
+    import re
+    import tempfile
+
+    from keyword_index import KeywordIndex
+
+    rng = random.Random(21)
+    vocabulary = [f"skill{i}" for i in range(300)] + ["Python", "IT", "C++", "Node.js", "remote work"]
+    # Most users start from a shared preset, the rest pick their own keywords
+    shared = [rng.sample(vocabulary, 12) for _ in range(presets)]
+    configs = {
+        user_id: {
+            "channels": rng.sample([f"@channel{i}" for i in range(30)], 4),
+            "keywords": rng.choice(shared) if rng.random() < 0.9 else rng.sample(vocabulary, 12),
+            "message_limit": 50,
+        }
+        for user_id in range(users)
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        UserConfigStore(os.path.join(tmp, "user_configs.db")).save_many(configs)
+
+        start = time.perf_counter()
+        store = UserConfigStore(os.path.join(tmp, "user_configs.db"))
+        loaded = store.load_all()
+        load_time = time.perf_counter() - start
+
+        index = KeywordIndex()
+        start = time.perf_counter()
+        for user_id, config in loaded.items():
+            index.set_user(user_id, config)
+        index_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        warmed = warm_matchers(loaded.values())
+        warm_time = time.perf_counter() - start
+        store.close()
+
+    assert loaded == configs
+    searchers = rng.sample(sorted(configs), 200)
+
+    start = time.perf_counter()
+    for user_id in searchers:
+        re.purge()  # What a search paid before: compile every regex again
+        normalize_keywords(configs[user_id]["keywords"])
+    cold = (time.perf_counter() - start) / len(searchers)
+
+    start = time.perf_counter()
+    for user_id in searchers:
+        compiled_matcher(configs[user_id]["keywords"])
+    first = (time.perf_counter() - start) / len(searchers)
+
+    print(f"⏱️ Startup with {users} stored users: load {load_time * 1000:.0f}ms, "
+          f"keyword index {index_time * 1000:.0f}ms, {warmed} shared matchers warmed in {warm_time * 1000:.0f}ms; "
+          f"first-search matcher {cold * 1e6:.0f}µs before, {first * 1e6:.0f}µs on average now")
+
+
+def test_config_store():
+    store = UserConfigStore(":memory:")
+    store.save(1, {"channels": ["@a"], "keywords": ["Python", "IT"], "message_limit": 50})
+    store.save(2, {"channels": ["@b"], "keywords": ["Go"], "message_limit": 20})
+    store.save(1, {"channels": ["@a", "@c"], "keywords": ["Python", "IT"], "message_limit": 50})
+    store.delete(2)
+    assert store.load_all() == {1: {"channels": ["@a", "@c"], "keywords": ["Python", "IT"], "message_limit": 50}}
+
+    # Live mode survives saving the config again
+    store.set_live(1, True)
+    store.save(1, {"channels": ["@a"], "keywords": ["Python"], "message_limit": 50})
+    assert store.live_users() == {1}
+    store.set_live(1, False)
+    assert store.live_users() == set()
+
+    # Matchers are shared by keyword lists that normalize the same and rebuilt when they change
+    matcher = compiled_matcher(["Python", "IT"])
+    assert compiled_matcher([" Python", "IT ", ""]) is matcher
+    assert compiled_matcher(["Python", "IT", "Go"]) is not matcher
+    assert matcher.find("Python dev, IT team") == ["Python", "IT"]
+    print("✅ User configs persist and share compiled matchers")
+
+
+if __name__ == "__main__":
+    test_config_store()
+    benchmark_startup()
@@ -1,11 +1,58 @@
+import asyncio
+import time
+
 import yaml
 
 def load_config(path="config.yaml"):
     with open(path, "r", encoding="utf-8") as f:
         return yaml.safe_load(f)
 
+class JobFileWriter:
+    """Writes matches to the text file as they arrive"""
+
+    def __init__(self, filename="filtered_jobs.txt"):
+        self.filename = filename
+        self.count = 0
+        self.file = open(filename, "w", encoding="utf-8")
+
+    def add(self, msg):
+        self.file.write(f"[{msg['channel']}] {msg['date']}\n{msg['text']}\n\n")
+        self.count += 1
+
+    def close(self):
+        self.file.close()
+        print(f"📄 Saved {self.count} messages to {self.filename}")
+
 def save_to_file(messages, filename="filtered_jobs.txt"):
-    with open(filename, "w", encoding="utf-8") as f:
-        for msg in messages:
-            f.write(f"[{msg['channel']}] {msg['date']}\n{msg['text']}\n\n")
-    print(f"📄 Saved {len(messages)} messages to {filename}")
+    writer = JobFileWriter(filename)
+    for msg in messages:
+        writer.add(msg)
+    writer.close()
+
+class LoopLagProbe:
+    """Records how late the event loop wakes a task sleeping `interval`, for the benchmarks"""
+
+    def __init__(self, interval=0.001):
+        self.interval = interval
+        self.lags = []
+        self._task = None
+
+    async def _run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.lags.append(time.perf_counter() - start - self.interval)
+
+    async def __aenter__(self):
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+
+    def p99(self, default=0.0):
+        return sorted(self.lags)[int(len(self.lags) * 0.99)] if self.lags else default
+
+    def max(self, default=0.0):
+        return max(self.lags, default=default)